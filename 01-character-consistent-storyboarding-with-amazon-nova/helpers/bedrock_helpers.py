@@ -1,20 +1,82 @@
 import json
+import math
 import random
-from botocore.exceptions import ClientError
 import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+from . import deadlines
+from .payload_validation import (
+    CANVAS_MAX_SEED,
+    CANVAS_MAX_TEXT_LENGTH,
+    REEL_MAX_TEXT_LENGTH,
+    CANVAS_MIN_SIDE,
+    CANVAS_SIDE_MULTIPLE,
+    REEL_MAX_SEED,
+    REEL_MAX_SHOTS,
+    validate_canvas_request,
+    validate_reel_request,
+    validate_text_request,
+)
+from .profiling import profiled
+from .prompt_helpers import (
+    FUSED_STAGES,
+    get_fused_prompt,
+    get_fused_scene_input,
+    get_multi_style_prompt,
+    get_style_prompt,
+    system_prompts,
+)
+from .structured_output import (
+    StructuredOutputError,
+    build_scene_repair_prompt,
+    expected_scene_count,
+    merge_scenes,
+    parse_json_response,
+    validate_story,
+)
 
 
 MAX_RETRIES = 50
 INITIAL_BACKOFF = 5
 
-def call_nova_lite(bedrock_client, user_prompt, system_prompt=None):
+# Output tokens requested per scene when re-asking for invalid scenes
+REPAIR_TOKENS_PER_SCENE = 1000
+MAX_SCENE_REPAIRS = 2
+
+# Scenes expanded per fused request, and output tokens budgeted per scene
+FUSED_BATCH_SIZE = 5
+FUSED_TOKENS_PER_SCENE = 800
+NOVA_LITE_MAX_TOKENS = 5000
+STAGE_MAX_LENGTH = {
+    "image": CANVAS_MAX_TEXT_LENGTH,
+    "style": CANVAS_MAX_TEXT_LENGTH,
+    "video": REEL_MAX_TEXT_LENGTH,
+}
+
+# Errors that no retry can fix: the loops raise them instead of backing off
+NON_RETRYABLE_ERROR_CODES = [
+    "ValidationException",
+    "AccessDeniedException",
+    "ResourceNotFoundException",
+    "UnrecognizedClientException",
+]
+
+# Seconds between status checks of running video jobs
+VIDEO_POLL_INTERVAL = 10
+
+# Previews are rendered at this fraction of the final resolution
+PREVIEW_SCALE = 0.5
+
+@profiled()
+def call_nova_lite(bedrock_client, user_prompt, system_prompt=None, max_new_tokens=2000):
 
     retries = 0
     backoff = INITIAL_BACKOFF
 
     body_json = {
         "inferenceConfig": {
-            "max_new_tokens": 2000,
+            "max_new_tokens": max_new_tokens,
             "temperature": 0.1,
             "topP": 0.6
         },
@@ -24,6 +86,7 @@ def call_nova_lite(bedrock_client, user_prompt, system_prompt=None):
     if system_prompt:
         body_json["system"] = [{"text": system_prompt}]
 
+    validate_text_request(body_json)
 
     input_data = {
         "modelId": "amazon.nova-lite-v1:0",
@@ -33,21 +96,25 @@ def call_nova_lite(bedrock_client, user_prompt, system_prompt=None):
     }
 
     while retries < MAX_RETRIES:
+        deadlines.check_deadline("model invocation")
         try:
             response = bedrock_client.invoke_model(**input_data)
             response_body = json.loads(response["body"].read().decode())
             return response_body["output"]["message"]["content"][0]["text"]
         except ClientError as e:
             error_code = e.response['Error']['Code']
+            if error_code in NON_RETRYABLE_ERROR_CODES:
+                raise
             print(f"Error: {error_code}. Retrying in {backoff} seconds...")
-            time.sleep(backoff)
+            deadlines.sleep(backoff, "model invocation")
             retries += 1
             backoff += 1
     
     raise Exception("Max retries reached. Unable to invoke model.")
 
 
-def generate_text(bedrock_client, model_id, user_prompt, system_prompt):
+@profiled()
+def generate_text(bedrock_client, model_id, user_prompt, system_prompt, max_tokens=20000):
     
     retries = 0
     backoff = INITIAL_BACKOFF
@@ -57,41 +124,169 @@ def generate_text(bedrock_client, model_id, user_prompt, system_prompt):
         {"role": "assistant", "content": "{"},
     ]
 
+    body_json = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": messages,
+        "system": system_prompt if system_prompt else "",
+        "temperature": 0.3,
+        "top_k": 40,
+        "top_p": 0.9,
+    }
+    validate_text_request(body_json)
+
     input_data = {
         "modelId": model_id,
         "contentType": "application/json",
         "accept": "application/json",
-        "body": json.dumps(
-            {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 20000,
-                "messages": messages,
-                "system": system_prompt if system_prompt else "",
-                "temperature": 0.3,
-                "top_k": 40,
-                "top_p": 0.9,
-            }
-        ),
+        "body": json.dumps(body_json),
     }
     while retries < MAX_RETRIES:
+        deadlines.check_deadline("model invocation")
         try:
             response = bedrock_client.invoke_model(**input_data)
             response_body = json.loads(response["body"].read().decode())
-            response_json_string = "{" + response_body["content"][0]["text"]
-            response_body_json = json.loads(response_json_string)
-            return response_body_json
+            # Malformed JSON is repaired locally instead of regenerated
+            return parse_json_response(response_body["content"][0]["text"], prefix="{")
         except ClientError as e:
             error_code = e.response['Error']['Code']
+            if error_code in NON_RETRYABLE_ERROR_CODES:
+                raise
             print(f"Error: {error_code}. Retrying in {backoff} seconds...")
-            time.sleep(backoff)
+            deadlines.sleep(backoff, "model invocation")
             retries += 1
             backoff += 1
     
     raise Exception("Max retries reached. Unable to invoke model.")
 
 
-def get_random_seed():
-    return random.randint(0, 2147483646)
+@profiled()
+def generate_story(bedrock_client, model_id, user_prompt, system_prompt, number_of_scenes=None):
+    """
+    Generate a story and repair it scene by scene instead of regenerating it.
+
+    The response is repaired locally by `generate_text` and validated against
+    the story format. Missing or invalid scenes are requested again in a small
+    follow-up call, up to MAX_SCENE_REPAIRS times. Only story-level problems
+    (no title or characters) or a response that cannot be parsed at all
+    trigger a full regeneration.
+    """
+    def draft():
+        try:
+            story = generate_text(bedrock_client, model_id, user_prompt, system_prompt)
+        except StructuredOutputError as e:
+            return None, [str(e)], []
+        return (story, *validate_story(story, number_of_scenes))
+
+    story, story_errors, invalid_scene_ids = draft()
+    if story_errors:
+        print(f"Invalid story ({', '.join(story_errors)}). Regenerating...")
+        story, story_errors, invalid_scene_ids = draft()
+        if story_errors:
+            raise Exception(f"Unable to generate a valid story: {', '.join(story_errors)}")
+
+    number_of_scenes = expected_scene_count(story, number_of_scenes)
+
+    for _ in range(MAX_SCENE_REPAIRS):
+        if not invalid_scene_ids:
+            break
+        print(f"Repairing scenes {invalid_scene_ids}...")
+        try:
+            repair = generate_text(
+                bedrock_client,
+                model_id,
+                build_scene_repair_prompt(story, invalid_scene_ids),
+                None,
+                max_tokens=REPAIR_TOKENS_PER_SCENE * len(invalid_scene_ids),
+            )
+        except StructuredOutputError as e:
+            # No scenes fixed this round
+            print(f"Unable to parse the repaired scenes ({str(e)[:100]}).")
+            continue
+        scenes = repair.get("scenes")
+        story = merge_scenes(story, scenes if isinstance(scenes, list) else [], number_of_scenes)
+        _, invalid_scene_ids = validate_story(story, number_of_scenes)
+
+    if invalid_scene_ids:
+        raise Exception(f"Unable to repair scenes {invalid_scene_ids}.")
+    return story
+
+
+def _valid_stage_prompt(stage, prompt):
+    return isinstance(prompt, str) and 0 < len(prompt.strip()) <= STAGE_MAX_LENGTH[stage]
+
+
+def _expand_stage(bedrock_client, stage, user_prompt, style):
+    system_prompt = get_style_prompt(style) if stage == "style" else system_prompts[stage]
+    response = parse_json_response(call_nova_lite(bedrock_client, user_prompt, system_prompt))
+    prompt = response.get("prompt")
+    if not _valid_stage_prompt(stage, prompt):
+        raise StructuredOutputError(f"Invalid {stage} prompt: {prompt!r}")
+    return prompt
+
+
+@profiled()
+def expand_scene_prompts(bedrock_client, scenes, style=None, stages=FUSED_STAGES, batch_size=FUSED_BATCH_SIZE):
+    """
+    Run the image, style and video prompt chain for many scenes in a few fused requests.
+
+    Scenes are sent in batches of `batch_size`, and every requested stage is
+    completed for each scene in one Nova Lite call. Results are mapped back by
+    scene_id. A stage that is missing or invalid for a scene (empty, or over
+    the model's prompt length limit) falls back to the regular one-call-per-stage
+    chain for that scene only.
+
+    Parameters:
+    -----------
+    scenes : list
+        Scenes of a story, with scene_id, description, imagery and characters
+    style : str, optional
+        Key of `style_presets`, required when "style" is in `stages`
+    stages : list
+        Stages to run, in chain order
+
+    Returns:
+    --------
+    dict
+        {scene_id: {stage: prompt}}
+    """
+    if "style" in stages and not style:
+        raise ValueError("A style is required for the style stage.")
+
+    system_prompt = get_fused_prompt(stages, style)
+    results = {scene["scene_id"]: {} for scene in scenes}
+    for start in range(0, len(scenes), batch_size):
+        batch = scenes[start : start + batch_size]
+        max_new_tokens = min(NOVA_LITE_MAX_TOKENS, FUSED_TOKENS_PER_SCENE * len(stages) * len(batch))
+        try:
+            response = parse_json_response(
+                call_nova_lite(bedrock_client, get_fused_scene_input(batch), system_prompt, max_new_tokens)
+            )
+            items = response.get("scenes") or []
+        except StructuredOutputError as e:
+            print(f"Fused request failed ({str(e)[:100]}). Falling back per scene...")
+            items = []
+        for item in items:
+            if isinstance(item, dict) and item.get("scene_id") in results:
+                for stage in stages:
+                    if _valid_stage_prompt(stage, item.get(stage)):
+                        results[item["scene_id"]][stage] = item[stage]
+
+    # Per-item fallback: only the stages the fused response did not cover are re-run
+    for scene in scenes:
+        prompts = results[scene["scene_id"]]
+        previous = get_fused_scene_input([scene])
+        for stage in stages:
+            if stage not in prompts:
+                print(f"Expanding {stage} prompt for scene {scene['scene_id']} individually...")
+                prompts[stage] = _expand_stage(bedrock_client, stage, previous, style)
+            previous = prompts[stage]
+    return results
+
+
+def get_random_seed(max_seed=REEL_MAX_SEED):
+    # Nova Canvas accepts a smaller seed range than Nova Reel, pass CANVAS_MAX_SEED for images
+    return random.randint(0, max_seed)
 
 
 def get_task_status(bedrock_client, invocation_arn):
@@ -101,30 +296,33 @@ def get_task_status(bedrock_client, invocation_arn):
     return response["status"]
 
 
-def generate_images(bedrock_client, model_id, user_prompt, negative_prompt, resolution=[1280,720], seed=None, image_count=3):
+@profiled()
+def generate_images(bedrock_client, model_id, user_prompt, negative_prompt, resolution=[1280,720], seed=None, image_count=3, quality="standard"):
     retries = 0
     backoff = INITIAL_BACKOFF
     
     if seed is None:
-        seed = get_random_seed()
+        seed = get_random_seed(CANVAS_MAX_SEED)
+
+    payload = {
+        "taskType": "TEXT_IMAGE",
+        "textToImageParams": {
+            "text": user_prompt,
+            "negativeText": negative_prompt,
+        },
+        "imageGenerationConfig": {
+            "seed": seed,
+            "quality": quality,
+            "numberOfImages": image_count,
+            "width": resolution[0],
+            "height": resolution[1],
+        },
+    }
+    validate_canvas_request(payload)
 
     while retries < MAX_RETRIES:
+        deadlines.check_deadline("model invocation")
         try:
-            payload = {
-                "taskType": "TEXT_IMAGE",
-                "textToImageParams": {
-                    "text": user_prompt,
-                    "negativeText": negative_prompt,
-                },
-                "imageGenerationConfig": {
-                    "seed": seed,
-                    "quality": "standard",
-                    "numberOfImages": image_count,
-                    "width": resolution[0],
-                    "height": resolution[1],
-                },
-            }
-        
             response = bedrock_client.invoke_model(
                 modelId=model_id, body=json.dumps(payload)
             )
@@ -133,14 +331,185 @@ def generate_images(bedrock_client, model_id, user_prompt, negative_prompt, reso
             return model_response["images"]
         except ClientError as e:
             error_code = e.response['Error']['Code']
+            if error_code in NON_RETRYABLE_ERROR_CODES:
+                raise
             print(f"Error: {error_code}. Retrying in {backoff} seconds...")
-            time.sleep(backoff)
+            deadlines.sleep(backoff, "model invocation")
             retries += 1
             backoff += 1
     
     raise Exception("Max retries reached. Unable to invoke model.")
 
-def generate_videos(bedrock_client, model_id, user_prompt, image_bytes, output_bucket, seed=None):
+def preview_resolution(resolution, scale=PREVIEW_SCALE):
+    """
+    Scale a Canvas resolution down for previews, keeping the aspect ratio and
+    the size limits (multiples of 16, at least 320 pixels per side).
+    """
+    ratio = max(scale, CANVAS_MIN_SIDE / min(resolution))
+    return [
+        max(CANVAS_MIN_SIDE, int(side * ratio) // CANVAS_SIDE_MULTIPLE * CANVAS_SIDE_MULTIPLE)
+        for side in resolution
+    ]
+
+
+@profiled()
+def generate_previews(bedrock_client, model_id, user_prompt, negative_prompt, resolution=[1280,720], candidates=3, seeds=None, scale=PREVIEW_SCALE, max_workers=3):
+    """
+    Generate cheap preview candidates for a prompt, to choose from before rendering the final image.
+
+    Each candidate is rendered with its own seed, one image per request, at
+    `standard` quality and a reduced resolution. A chosen candidate can then
+    be re-rendered with `finalize_images` from its seed and prompt alone.
+
+    Parameters:
+    -----------
+    resolution : list
+        The final [width, height]; previews use `preview_resolution(resolution, scale)`
+    candidates : int
+        Number of previews, ignored when `seeds` is given
+    seeds : list, optional
+        Seeds to preview, random Canvas seeds by default
+
+    Returns:
+    --------
+    list
+        One dict per candidate with "prompt", "negative_prompt", "seed" and
+        "image" (base64-encoded preview)
+    """
+    if seeds is None:
+        seeds = [get_random_seed(CANVAS_MAX_SEED) for _ in range(candidates)]
+    preview_size = preview_resolution(resolution, scale)
+
+    def render(seed):
+        return generate_images(
+            bedrock_client, model_id, user_prompt, negative_prompt,
+            resolution=preview_size, seed=seed, image_count=1, quality="standard",
+        )[0]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        images = list(executor.map(deadlines.propagate(render), seeds))
+
+    return [
+        {"prompt": user_prompt, "negative_prompt": negative_prompt, "seed": seed, "image": image}
+        for seed, image in zip(seeds, images)
+    ]
+
+
+@profiled()
+def finalize_images(bedrock_client, model_id, selected_candidates, resolution=[1280,720], quality="premium", max_workers=3):
+    """
+    Re-render selected preview candidates at full resolution and premium quality.
+
+    Parameters:
+    -----------
+    selected_candidates : list
+        Candidate dicts returned by `generate_previews`
+
+    Returns:
+    --------
+    list
+        The base64-encoded final image of each candidate, in the same order
+    """
+    def render(candidate):
+        return generate_images(
+            bedrock_client, model_id, candidate["prompt"], candidate["negative_prompt"],
+            resolution=resolution, seed=candidate["seed"], image_count=1, quality=quality,
+        )[0]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(deadlines.propagate(render), selected_candidates))
+
+
+@profiled()
+def rewrite_styles(bedrock_client, user_prompt, styles):
+    """
+    Revise one image prompt for several `style_presets` in a single Nova Lite call.
+
+    Styles missing from the response, or whose prompt is empty or too long for
+    Nova Canvas, fall back to the single-style revision with `get_style_prompt`.
+
+    Returns:
+    --------
+    dict
+        The revised prompt per style
+    """
+    try:
+        response = parse_json_response(
+            call_nova_lite(bedrock_client, user_prompt, get_multi_style_prompt(styles),
+                           min(NOVA_LITE_MAX_TOKENS, FUSED_TOKENS_PER_SCENE * len(styles)))
+        )
+        prompts = response.get("prompts") or {}
+    except StructuredOutputError as e:
+        print(f"Multi-style request failed ({str(e)[:100]}). Falling back per style...")
+        prompts = {}
+
+    revised = {}
+    for style in styles:
+        if isinstance(prompts, dict) and _valid_stage_prompt("style", prompts.get(style)):
+            revised[style] = prompts[style]
+        else:
+            print(f"Revising prompt for style '{style}' individually...")
+            revised[style] = _expand_stage(bedrock_client, "style", user_prompt, style)
+    return revised
+
+
+@profiled()
+def generate_style_variants(bedrock_client, model_id, scene_prompts, styles, negative_prompt, resolution=[1280,720], seeds=None, image_count=1, max_workers=4):
+    """
+    Render every scene in several styles, to compare `style_presets` side by side.
+
+    Each scene's prompt is revised for all styles in one text call (run
+    concurrently across scenes), then all style x scene Canvas requests are
+    sent concurrently. The variants of a scene share one seed, so they
+    differ only in style.
+
+    Parameters:
+    -----------
+    scene_prompts : list
+        Imagery prompt of each scene
+    styles : list
+        Keys of `style_presets`
+    seeds : list, optional
+        Seed of each scene, random Canvas seeds by default
+
+    Returns:
+    --------
+    dict
+        For each style, a list with one dict per scene holding "prompt",
+        "seed" and "images" (base64-encoded)
+    """
+    if seeds is None:
+        seeds = [get_random_seed(CANVAS_MAX_SEED) for _ in scene_prompts]
+    if len(seeds) != len(scene_prompts):
+        raise ValueError("seeds must have one entry per scene.")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        revised = list(executor.map(
+            deadlines.propagate(lambda prompt: rewrite_styles(bedrock_client, prompt, styles)), scene_prompts
+        ))
+
+        def render(style, scene):
+            return generate_images(
+                bedrock_client, model_id, revised[scene][style], negative_prompt,
+                resolution=resolution, seed=seeds[scene], image_count=image_count,
+            )
+
+        render = deadlines.propagate(render)
+        futures = {
+            style: [executor.submit(render, style, scene) for scene in range(len(scene_prompts))]
+            for style in styles
+        }
+        return {
+            style: [
+                {"prompt": revised[scene][style], "seed": seeds[scene], "images": future.result()}
+                for scene, future in enumerate(style_futures)
+            ]
+            for style, style_futures in futures.items()
+        }
+
+
+@profiled()
+def generate_videos(bedrock_client, model_id, user_prompt, image_bytes, output_bucket, seed=None, image_format="png"):
     retries = 0
     backoff = INITIAL_BACKOFF
     
@@ -151,7 +520,7 @@ def generate_videos(bedrock_client, model_id, user_prompt, image_bytes, output_b
         "taskType": "TEXT_VIDEO",
         "textToVideoParams": {
             "text": user_prompt,
-            "images": [{ "format": "png", "source": { "bytes": image_bytes} }]
+            "images": [{ "format": image_format, "source": { "bytes": image_bytes} }]
         },
         "videoGenerationConfig": {
             "durationSeconds": 6,
@@ -160,9 +529,11 @@ def generate_videos(bedrock_client, model_id, user_prompt, image_bytes, output_b
             "seed": seed
         }
     }
+    validate_reel_request(model_input)
 
     # Start async invocation with retries
     while retries < MAX_RETRIES:
+        deadlines.check_deadline("model invocation")
         try:
             invocation = bedrock_client.start_async_invoke(
                 modelId=model_id,
@@ -186,19 +557,168 @@ def generate_videos(bedrock_client, model_id, user_prompt, image_bytes, output_b
                     print(f"Task failed with status: {status}")
                     raise Exception(f"Video generation failed with status: {status}")
                     
-                time.sleep(10)
+                deadlines.sleep(VIDEO_POLL_INTERVAL, "video generation")
                 
         except ClientError as e:
             print(e)
             error_code = e.response['Error']['Code']
+            if error_code in NON_RETRYABLE_ERROR_CODES:
+                raise
             print(f"Error: {error_code}. Retrying in {backoff} seconds...")
-            time.sleep(backoff)
+            deadlines.sleep(backoff, "model invocation")
             retries += 1
             backoff += 1
     
     raise Exception("Max retries reached. Unable to generate video.")
 
 
+def split_shots(count, max_shots=REEL_MAX_SHOTS):
+    """
+    Split `count` shots into as few multi-shot jobs as the shot limit allows.
+
+    Jobs are balanced (e.g. 21 shots become 11 + 10, not 20 + 1) so no job
+    ends up with a single shot, which a multi-shot request does not accept.
+
+    Returns:
+    --------
+    list
+        (start, end) slice bounds of each job
+    """
+    jobs = math.ceil(count / max_shots)
+    bounds = [round(i * count / jobs) for i in range(jobs + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _start_video_job(bedrock_client, model_id, model_input, output_bucket):
+    retries = 0
+    backoff = INITIAL_BACKOFF
+
+    while retries < MAX_RETRIES:
+        deadlines.check_deadline("model invocation")
+        try:
+            invocation = bedrock_client.start_async_invoke(
+                modelId=model_id,
+                modelInput=model_input,
+                outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{output_bucket}"}}
+            )
+            return invocation["invocationArn"]
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in NON_RETRYABLE_ERROR_CODES:
+                raise
+            print(f"Error: {error_code}. Retrying in {backoff} seconds...")
+            deadlines.sleep(backoff, "model invocation")
+            retries += 1
+            backoff += 1
+
+    raise Exception("Max retries reached. Unable to start video generation.")
+
+
+@profiled()
+def generate_animatic(bedrock_client, model_id, prompts, images, output_bucket, seed=None, image_format="png", max_shots=REEL_MAX_SHOTS):
+    """
+    Generate a storyboard animatic with Nova Reel multi-shot jobs instead of one job per scene.
+
+    Each scene becomes one 6-second shot, starting from its storyboard image.
+    Up to `max_shots` shots are packed into a single MULTI_SHOT_MANUAL job;
+    longer stories are split into a few balanced jobs that run concurrently
+    and are polled together. A single scene falls back to a TEXT_VIDEO job.
+    Multi-shot requests need Nova Reel 1.1 (amazon.nova-reel-v1:1).
+
+    Parameters:
+    -----------
+    prompts : list
+        Motion prompt of each scene
+    images : list
+        Base64-encoded first frame of each scene, or None for a text-only shot
+    output_bucket : str
+        S3 bucket (and optional prefix) for the videos
+    seed : int, optional
+        Seed shared by every job, random by default
+
+    Returns:
+    --------
+    list
+        S3 location of each job's output, in scene order. The animatic is
+        the `output.mp4` of each location, played in order.
+    """
+    if len(prompts) != len(images):
+        raise ValueError("prompts and images must have one entry per scene.")
+    if not prompts:
+        raise ValueError("At least one scene is required.")
+
+    if seed is None:
+        seed = get_random_seed()
+    video_config = {"fps": 24, "dimension": "1280x720", "seed": seed}
+
+    shots = []
+    for prompt, image in zip(prompts, images):
+        shot = {"text": prompt}
+        if image is not None:
+            shot["image"] = {"format": image_format, "source": {"bytes": image}}
+        shots.append(shot)
+
+    if len(shots) == 1:
+        model_inputs = [{
+            "taskType": "TEXT_VIDEO",
+            "textToVideoParams": {
+                "text": shots[0]["text"],
+                **({"images": [shots[0]["image"]]} if "image" in shots[0] else {}),
+            },
+            "videoGenerationConfig": {"durationSeconds": 6, **video_config},
+        }]
+    else:
+        model_inputs = [
+            {
+                "taskType": "MULTI_SHOT_MANUAL",
+                "multiShotManualParams": {"shots": shots[start:end]},
+                "videoGenerationConfig": video_config,
+            }
+            for start, end in split_shots(len(shots), max_shots)
+        ]
+    # Validate every job before any is started, so a bad scene fails fast
+    for model_input in model_inputs:
+        validate_reel_request(model_input, model_id)
+
+    invocation_arns = [
+        _start_video_job(bedrock_client, model_id, model_input, output_bucket) for model_input in model_inputs
+    ]
+    s3_locations = [f"s3://{output_bucket}/{arn.split('/')[-1]}" for arn in invocation_arns]
+    print(f"Started {len(invocation_arns)} video job(s) for {len(shots)} scenes:")
+    for s3_location in s3_locations:
+        print(f"S3 URI: {s3_location}")
+
+    # Poll all jobs in one loop
+    running = set(invocation_arns)
+    retries = 0
+    backoff = INITIAL_BACKOFF
+    while running:
+        for arn in sorted(running):
+            try:
+                status = get_task_status(bedrock_client, arn)
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                if error_code in NON_RETRYABLE_ERROR_CODES:
+                    raise
+                retries += 1
+                if retries >= MAX_RETRIES:
+                    raise Exception("Max retries reached. Unable to get video generation status.")
+                print(f"Error: {error_code}. Retrying in {backoff} seconds...")
+                deadlines.sleep(backoff, "video generation")
+                backoff += 1
+                break
+            if status == "Completed":
+                running.discard(arn)
+            elif status == "Failed":
+                raise Exception(f"Video generation failed for {arn}")
+        else:
+            print(f"Jobs completed: {len(invocation_arns) - len(running)}/{len(invocation_arns)}")
+            if running:
+                deadlines.sleep(VIDEO_POLL_INTERVAL, "video generation")
+
+    return s3_locations
+
+
 def invoke_model_with_retry(modelId, body):
     retries = 0
     backoff = INITIAL_BACKOFF
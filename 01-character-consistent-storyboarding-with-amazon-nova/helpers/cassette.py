@@ -0,0 +1,224 @@
+"""
+Record and replay Amazon Bedrock and S3 traffic.
+
+In record mode a `Cassette` wraps real clients and stores every request,
+response body and measured latency of the recorded methods. In replay mode
+it serves those responses back without any network access, optionally with
+the original timing, so the local code paths of the storyboard flow can be
+profiled with real payload sizes. Wrapped clients can be passed anywhere the
+helpers expect a `bedrock_client` or `s3_client`.
+
+    cassette = Cassette("output/storyboard.cassette", mode="record")
+    bedrock_runtime_client = cassette.wrap(bedrock_runtime_client)
+    ...
+    cassette.save()
+"""
+
+import base64
+import datetime
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+
+RECORDED_METHODS = [
+    "invoke_model",
+    "start_async_invoke",
+    "get_async_invoke",
+    "head_object",
+    "get_object",
+    "put_object",
+    "list_objects_v2",
+    "download_file",
+    "upload_file",
+]
+
+# Arguments that describe how a call is made rather than what is asked for
+IGNORED_ARGUMENTS = ["Config", "Callback", "ExtraArgs"]
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        if "__datetime__" in value:
+            return datetime.datetime.fromisoformat(value["__datetime__"])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _request_key(method, args, kwargs):
+    request = {k: v for k, v in kwargs.items() if k not in IGNORED_ARGUMENTS}
+    return json.dumps([method, _encode(list(args)), _encode(request)], sort_keys=True, default=str)
+
+
+def _download_path(args, kwargs):
+    return kwargs["Filename"] if "Filename" in kwargs else args[2]
+
+
+class Cassette:
+    """
+    A file of recorded client calls.
+
+    Parameters:
+    -----------
+    path : str
+        Cassette file, gzip-compressed JSON lines
+    mode : str
+        "record" to call the real clients and store their responses,
+        "replay" to serve stored responses
+    realtime : bool, optional
+        In replay mode, sleep for each call's recorded latency
+    speed : float, optional
+        Divides the recorded latencies when `realtime` is set
+    strict : bool, optional
+        In replay mode, only serve recordings whose request matches exactly.
+        Otherwise a call with no exact match (e.g. a new random seed) gets the
+        next unused recording of the same method.
+    """
+
+    def __init__(self, path, mode="replay", realtime=False, speed=1.0, strict=False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self.speed = speed
+        self.strict = strict
+        self.records = []
+        self._lock = threading.Lock()
+        self._by_request = defaultdict(deque)
+        self._by_method = defaultdict(deque)
+        self._used = set()
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        with gzip.open(self.path, "rt") as f:
+            for line in f:
+                record = json.loads(line)
+                index = len(self.records)
+                self.records.append(record)
+                self._by_request[record["key"]].append(index)
+                self._by_method[record["method"]].append(index)
+
+    def save(self):
+        """Write the recorded calls to the cassette file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, gzip.open(self.path, "wt") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+    def wrap(self, client):
+        """Return a client that records through `client`, or replays without it (client may be None)."""
+        return CassetteClient(self, client)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.mode == "record":
+            self.save()
+
+    def record(self, client, method, args, kwargs):
+        start = time.perf_counter()
+        error = None
+        try:
+            response = getattr(client, method)(*args, **kwargs)
+        except ClientError as e:
+            error = e
+            response = None
+        latency = time.perf_counter() - start
+
+        record = {"method": method, "key": _request_key(method, args, kwargs), "latency": latency}
+        if error is not None:
+            record["error"] = {"response": _encode(error.response), "operation": error.operation_name}
+        elif method == "download_file":
+            with open(_download_path(args, kwargs), "rb") as f:
+                record["file"] = _encode(f.read())
+        elif isinstance(response, dict):
+            response = dict(response)
+            streams = {}
+            for name, value in response.items():
+                # Streaming bodies can only be read once: keep the bytes and hand back a fresh stream
+                if hasattr(value, "read"):
+                    streams[name] = value.read()
+                    response[name] = StreamingBody(io.BytesIO(streams[name]), len(streams[name]))
+            record["response"] = _encode({k: v for k, v in response.items() if k not in streams})
+            record["streams"] = _encode(streams)
+        with self._lock:
+            self.records.append(record)
+        if error is not None:
+            raise error
+        return response
+
+    def _next_record(self, method, key):
+        with self._lock:
+            for queue in (self._by_request[key], None if self.strict else self._by_method[method]):
+                while queue:
+                    index = queue.popleft()
+                    if index not in self._used:
+                        self._used.add(index)
+                        return self.records[index]
+        raise KeyError(f"No recorded {method} call left for request {key[:200]}")
+
+    def replay(self, method, args, kwargs):
+        record = self._next_record(method, _request_key(method, args, kwargs))
+        if self.realtime:
+            time.sleep(record["latency"] / self.speed)
+        if "error" in record:
+            raise ClientError(_decode(record["error"]["response"]), record["error"]["operation"])
+        if method == "download_file":
+            with open(_download_path(args, kwargs), "wb") as f:
+                f.write(_decode(record["file"]))
+            return None
+        if "response" not in record:
+            return None
+        response = _decode(record["response"])
+        for name, data in _decode(record.get("streams", {})).items():
+            response[name] = StreamingBody(io.BytesIO(data), len(data))
+        return response
+
+
+class CassetteClient:
+    """A client proxy that routes the recorded methods through a `Cassette`."""
+
+    def __init__(self, cassette, client):
+        self._cassette = cassette
+        self._client = client
+
+    def __getattr__(self, name):
+        if name not in RECORDED_METHODS:
+            if self._client is None:
+                raise AttributeError(f"{name} is not recorded and there is no client to call in replay mode")
+            return getattr(self._client, name)
+
+        def call(*args, **kwargs):
+            if self._cassette.mode == "record":
+                return self._cassette.record(self._client, name, args, kwargs)
+            return self._cassette.replay(name, args, kwargs)
+
+        return call
@@ -0,0 +1,239 @@
+"""
+Score storyboard candidates against character reference images and pick the best one per scene.
+
+All candidates are compared to all references in one batch. Each feature
+extractor turns a list of images into a matrix with one L2-normalized row per
+image, so a similarity matrix is a single matrix product. A candidate's score
+is its mean similarity to the references, averaged over the extractors by
+weight.
+
+Feature extractors are pluggable: any callable that maps a list of PIL images
+to an (n, d) array can be used. `HistogramFeatures` compares color palettes,
+which holds up when the pose and framing change between scenes;
+`PixelFeatures` compares downsampled layouts; `EmbeddingFeatures` wraps an
+embedding function such as `embedding_index.titan_embedding_fn`.
+"""
+
+import base64
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+from .profiling import profiled
+
+
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_HISTOGRAM_BINS = 8
+DEFAULT_PIXEL_SIZE = 32
+HISTOGRAM_SIZE = 128
+
+
+def load_image(image):
+    """Return a RGB PIL image from a PIL image, raw bytes, a base64 string or a file path."""
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+    if isinstance(image, (bytes, bytearray)):
+        return Image.open(io.BytesIO(image)).convert("RGB")
+    if isinstance(image, str) and os.path.exists(image):
+        return Image.open(image).convert("RGB")
+    return Image.open(io.BytesIO(base64.b64decode(image))).convert("RGB")
+
+
+def _normalize_rows(features):
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / np.where(norms > 0, norms, 1)
+
+
+class HistogramFeatures:
+    """
+    Joint RGB color histograms, `bins` levels per channel.
+
+    Rows hold the square roots of the normalized histograms, so the dot product
+    of two rows is their Bhattacharyya coefficient (1 for identical palettes).
+    """
+
+    name = "histogram"
+
+    def __init__(self, bins=DEFAULT_HISTOGRAM_BINS):
+        self.bins = bins
+
+    def __call__(self, images):
+        pixels = np.stack([
+            np.asarray(image.resize((HISTOGRAM_SIZE, HISTOGRAM_SIZE), Image.Resampling.BILINEAR))
+            for image in images
+        ]).reshape(len(images), -1, 3)
+        levels = (pixels.astype(np.uint32) * self.bins) >> 8
+        cells = self.bins ** 3
+        index = levels[..., 0] * self.bins * self.bins + levels[..., 1] * self.bins + levels[..., 2]
+        # Offset each image's bins so one bincount builds every histogram at once
+        index += (np.arange(len(images), dtype=np.uint32) * cells)[:, None]
+        counts = np.bincount(index.ravel(), minlength=len(images) * cells).reshape(len(images), cells)
+        return _normalize_rows(np.sqrt(counts.astype(np.float32)))
+
+
+class PixelFeatures:
+    """Mean-centered pixels of a `size` x `size` thumbnail."""
+
+    name = "pixels"
+
+    def __init__(self, size=DEFAULT_PIXEL_SIZE, grayscale=False):
+        self.size = size
+        self.grayscale = grayscale
+
+    def __call__(self, images):
+        mode = "L" if self.grayscale else "RGB"
+        pixels = np.stack([
+            np.asarray(image.convert(mode).resize((self.size, self.size), Image.Resampling.BILINEAR), dtype=np.float32)
+            for image in images
+        ]).reshape(len(images), -1)
+        return _normalize_rows(pixels - pixels.mean(axis=1, keepdims=True))
+
+
+class EmbeddingFeatures:
+    """Vectors from an embedding function that maps one PIL image to a vector."""
+
+    name = "embedding"
+
+    def __init__(self, embed_fn):
+        self.embed_fn = embed_fn
+
+    def __call__(self, images):
+        return _normalize_rows(np.stack([np.asarray(self.embed_fn(image), dtype=np.float32) for image in images]))
+
+
+class ConsistencyScorer:
+    """
+    Scores images by their similarity to a set of character reference images.
+
+    Parameters:
+    -----------
+    references : list
+        Reference images of the character(s), as PIL images, bytes, base64 strings or paths
+    features : list, optional
+        Feature extractors, `HistogramFeatures()` by default
+    weights : list, optional
+        Weight of each extractor in the score, equal by default
+    """
+
+    def __init__(self, references, features=None, weights=None):
+        self.features = features or [HistogramFeatures()]
+        self.weights = np.asarray(weights or [1.0] * len(self.features), dtype=np.float32)
+        if len(self.weights) != len(self.features):
+            raise ValueError("weights must have one entry per feature extractor.")
+        self.weights = self.weights / self.weights.sum()
+        reference_images = [load_image(image) for image in references]
+        if not reference_images:
+            raise ValueError("At least one reference image is required.")
+        self._references = [extract(reference_images) for extract in self.features]
+
+    @profiled("ConsistencyScorer.score")
+    def score(self, images):
+        """
+        Score a batch of images.
+
+        Returns:
+        --------
+        numpy.ndarray
+            One score per image: the weighted mean similarity to the references
+        """
+        images = [load_image(image) for image in images]
+        if not images:
+            return np.zeros(0, dtype=np.float32)
+        scores = np.zeros(len(images), dtype=np.float32)
+        for extract, references, weight in zip(self.features, self._references, self.weights):
+            scores += weight * (extract(images) @ references.T).mean(axis=1)
+        return scores
+
+
+def rank_candidates(scorer, candidates):
+    """
+    Score the candidates of every scene in one batch and rank them.
+
+    Parameters:
+    -----------
+    scorer : ConsistencyScorer
+        Scorer holding the reference images
+    candidates : dict or ImageStore
+        Candidate images per scene
+
+    Returns:
+    --------
+    dict
+        Per scene: "index" and "score" of the best candidate, the "scores" of
+        all candidates and their "ranking" (indices, best first)
+    """
+    keys = list(candidates)
+    images = [candidates[key] for key in keys]
+    scores = scorer.score([image for scene_images in images for image in scene_images])
+    bounds = np.cumsum([0] + [len(scene_images) for scene_images in images])
+
+    selection = {}
+    for key, start, end in zip(keys, bounds[:-1], bounds[1:]):
+        scene_scores = scores[start:end]
+        if len(scene_scores) == 0:
+            continue
+        ranking = np.argsort(-scene_scores)
+        selection[key] = {
+            "index": int(ranking[0]),
+            "score": float(scene_scores[ranking[0]]),
+            "scores": scene_scores.tolist(),
+            "ranking": ranking.tolist(),
+        }
+    return selection
+
+
+def select_best_candidates(scorer, candidates, regenerate=None, threshold=DEFAULT_THRESHOLD, max_rounds=1):
+    """
+    Pick the most consistent candidate per scene, regenerating only the scenes that score too low.
+
+    Parameters:
+    -----------
+    scorer : ConsistencyScorer
+        Scorer holding the reference images
+    candidates : dict or ImageStore
+        Candidate images per scene. Regenerated images are appended to the
+        scene's entry, so the store keeps every candidate that was scored.
+    regenerate : callable, optional
+        `regenerate(key)` returns new candidate images for a scene, e.g. with a
+        new seed. Without it, scenes below the threshold are only reported.
+    threshold : float, optional
+        Minimum score of an accepted scene. Scores depend on the feature
+        extractors, so calibrate it on a few scenes you consider consistent.
+    max_rounds : int, optional
+        Regeneration rounds for scenes that stay below the threshold
+
+    Returns:
+    --------
+    dict
+        The `rank_candidates` entry of each scene, with "accepted" set to
+        whether its best score reached the threshold
+    """
+    selection = rank_candidates(scorer, candidates)
+    for round_number in range(max_rounds if regenerate is not None else 0):
+        below = [key for key, entry in selection.items() if entry["score"] < threshold]
+        if not below:
+            break
+        print(f"Round {round_number + 1}: regenerating {len(below)} scene(s) below {threshold}: {below}")
+        new_candidates = {}
+        for key in below:
+            new_candidates[key] = list(regenerate(key))
+            if hasattr(candidates, "extend"):
+                candidates.extend(key, new_candidates[key])
+            else:
+                candidates[key] = list(candidates[key]) + new_candidates[key]
+        # Only the new images are scored; earlier scores are kept
+        for key, entry in rank_candidates(scorer, new_candidates).items():
+            scores = np.asarray(selection[key]["scores"] + entry["scores"], dtype=np.float32)
+            ranking = np.argsort(-scores)
+            selection[key] = {
+                "index": int(ranking[0]),
+                "score": float(scores[ranking[0]]),
+                "scores": scores.tolist(),
+                "ranking": ranking.tolist(),
+            }
+
+    for entry in selection.values():
+        entry["accepted"] = entry["score"] >= threshold
+    return selection
@@ -0,0 +1,77 @@
+"""
+Run deadlines shared by every helper call.
+
+A deadline set with `run_deadline` applies to everything called inside the
+`with` block: the retry loops and polling loops in `bedrock_helpers.py` stop
+waiting and raise `DeadlineExceeded` once it has passed. Nested deadlines
+never extend an outer one.
+
+    with run_deadline(15 * 60):
+        for scene in story["scenes"]:
+            images = generate_images(...)
+"""
+
+import contextlib
+import contextvars
+import time
+
+from .profiling import record_sleep
+
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the current run deadline has passed."""
+
+
+@contextlib.contextmanager
+def run_deadline(seconds):
+    """Limit the code in the `with` block to `seconds`, or to the enclosing deadline if that is sooner."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Return the seconds left before the current deadline, or None when there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_deadline(action="operation"):
+    if remaining() == 0.0:
+        raise DeadlineExceeded(f"Deadline exceeded before {action} could complete.")
+
+
+def sleep(seconds, action="operation"):
+    """`time.sleep` that raises DeadlineExceeded instead of sleeping past the current deadline."""
+    left = remaining()
+    if left is not None and left < seconds:
+        time.sleep(left)
+        record_sleep(left)
+        raise DeadlineExceeded(f"Deadline exceeded while waiting to retry {action}.")
+    time.sleep(seconds)
+    record_sleep(seconds)
+
+
+def propagate(fn):
+    """
+    Wrap a function so it runs with the caller's deadline in a worker thread.
+
+    Context variables are not inherited by thread pool workers, so wrap
+    functions before passing them to `ThreadPoolExecutor.map` or `submit`.
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call runs in its own copy
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
@@ -3,6 +3,8 @@ import base64
 import io
 from PIL import Image
 
+from .profiling import profiled
+
 def display_story_table(story_data):
     """
     Create a nicely formatted HTML table to display story information.
@@ -222,6 +224,7 @@ def display_prompt_table(story_data, image_prompts):
     # Display the HTML
     display(HTML(html_content))
 
+@profiled()
 def pil_image_to_base64(pil_image):
     """
     Convert a PIL Image object to a base64-encoded string.
@@ -241,6 +244,7 @@ def pil_image_to_base64(pil_image):
     img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
     return img_str
 
+@profiled()
 def display_images_in_row(image_data, caption=None, width=300):
     """
     Display a list of images in a single row with an optional description column.
@@ -303,20 +307,26 @@ def display_images_in_row(image_data, caption=None, width=300):
     # Display the HTML
     display(HTML(html))
 
+@profiled()
 def display_storyboard(image_data, story):
     """
     Display a storyboard with images for each scene.
     
     Parameters:
     -----------
-    image_data : dict
+    image_data : dict or ImageStore
         Dictionary where keys are scene IDs and values are lists of images
         (either base64-encoded strings or PIL Image objects)
     story : dict
         Dictionary containing story data with scenes
     """
     for i, scene in enumerate(story):
-        display_images_in_row(image_data[i], caption=story[i]["description"])
+        if hasattr(image_data, "base64_images"):
+            # ImageStore: show the encoded files without decoding them
+            images = image_data.base64_images(i)
+        else:
+            images = image_data[i]
+        display_images_in_row(images, caption=story[i]["description"])
 
 def display_hyperlink(text, address):
     display(HTML(f'<a href="{address}">{text}</a>'))
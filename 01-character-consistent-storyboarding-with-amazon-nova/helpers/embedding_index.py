@@ -0,0 +1,324 @@
+"""
+An embedding index over generated images and prompts, to reuse near-identical assets.
+
+Vectors live in a memory-mapped float32 matrix on disk and metadata in a JSON
+lines file next to it. Searches are a single matrix product over all stored
+vectors, so top-k queries over 100k+ entries take milliseconds. The embedding
+function must be given explicitly: `titan_embedding_fn` uses Amazon Titan
+Multimodal Embeddings on Amazon Bedrock. `local_embedding` is a deterministic
+stand-in for offline tests only; its trigram vectors are dominated by the
+text prompts share (style and character description), so it must not drive
+real reuse decisions.
+
+Reuse only ever matches entries generated with the same configuration
+(resolution, image count, negative prompt, seed); similarity is compared
+within that group.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+
+DEFAULT_DIMENSION = 256
+INITIAL_CAPACITY = 1024
+DEFAULT_THRESHOLD = 0.98
+
+TEXT = "text"
+IMAGE = "image"
+
+
+def local_embedding(item, dimension=DEFAULT_DIMENSION):
+    """
+    Deterministic embedding for tests and offline runs, not for reuse decisions.
+
+    Text is embedded as hashed character trigrams, images as their pixels
+    downsampled to a small grayscale thumbnail. Both are L2-normalized.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    if isinstance(item, str):
+        text = f"  {item.lower()} "
+        for i in range(len(text) - 2):
+            bucket = int.from_bytes(hashlib.blake2b(text[i : i + 3].encode(), digest_size=4).digest(), "little")
+            vector[bucket % dimension] += 1.0
+    else:
+        side = int(np.sqrt(dimension))
+        thumbnail = item.convert("L").resize((side, side), Image.Resampling.BILINEAR)
+        pixels = np.asarray(thumbnail, dtype=np.float32).ravel()
+        vector[: pixels.size] = pixels - pixels.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def titan_embedding_fn(bedrock_client, model_id="amazon.titan-embed-image-v1", dimension=DEFAULT_DIMENSION):
+    """Return an embedding function backed by Amazon Titan Multimodal Embeddings (text and images share one space)."""
+
+    def embed(item):
+        body = {"embeddingConfig": {"outputEmbeddingLength": dimension}}
+        if isinstance(item, str):
+            body["inputText"] = item
+        else:
+            buffer = io.BytesIO()
+            item.save(buffer, format="PNG")
+            body["inputImage"] = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        response = bedrock_client.invoke_model(modelId=model_id, body=json.dumps(body))
+        vector = np.asarray(json.loads(response["body"].read())["embedding"], dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    return embed
+
+
+class EmbeddingIndex:
+    """
+    A persistent, memory-mapped index of embedding vectors with metadata.
+
+    Parameters:
+    -----------
+    directory : str
+        Where the vector matrix, metadata and saved images are stored
+    embed_fn : callable
+        Maps a prompt (str) or a PIL image to a vector of `dimension` floats,
+        e.g. `titan_embedding_fn(bedrock_client)`
+    dimension : int, optional
+        Length of the embedding vectors
+    """
+
+    def __init__(self, directory, embed_fn, dimension=DEFAULT_DIMENSION):
+        if embed_fn is None:
+            raise ValueError("An embedding function is required, e.g. titan_embedding_fn(bedrock_client).")
+        self.directory = directory
+        self.dimension = dimension
+        self.embed_fn = embed_fn
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.metadata_path = os.path.join(directory, "metadata.jsonl")
+        self.images_dir = os.path.join(directory, "images")
+        self._lock = threading.Lock()
+        os.makedirs(self.images_dir, exist_ok=True)
+
+        self.metadata = []
+        if os.path.exists(self.metadata_path):
+            with open(self.metadata_path, "r") as f:
+                self.metadata = [json.loads(line) for line in f if line.strip()]
+        self._kinds = np.array([m["kind"] == IMAGE for m in self.metadata], dtype=bool)
+        self._config_ids = {}
+        self._configs = np.array([self._config_id(m.get("config")) for m in self.metadata], dtype=np.int64)
+        capacity = max(INITIAL_CAPACITY, len(self.metadata))
+        self._open(capacity)
+
+    def _open(self, capacity):
+        byte_size = capacity * self.dimension * 4
+        if not os.path.exists(self.vectors_path) or os.path.getsize(self.vectors_path) < byte_size:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(byte_size)
+        capacity = os.path.getsize(self.vectors_path) // (self.dimension * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _config_id(self, config):
+        key = config_key(config)
+        if key not in self._config_ids:
+            self._config_ids[key] = len(self._config_ids)
+        return self._config_ids[key]
+
+    def __len__(self):
+        return len(self.metadata)
+
+    def add(self, vectors, metadata):
+        """
+        Append vectors with one metadata dict each (must include "kind": "text" or "image").
+
+        Returns:
+        --------
+        list
+            The positions of the new entries
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        with self._lock:
+            start = len(self.metadata)
+            end = start + len(vectors)
+            if end > self._vectors.shape[0]:
+                self._vectors.flush()
+                self._open(max(end, self._vectors.shape[0] * 2))
+            self._vectors[start:end] = vectors
+            self._vectors.flush()
+            with open(self.metadata_path, "a") as f:
+                for entry in metadata:
+                    f.write(json.dumps(entry) + "\n")
+            self.metadata.extend(metadata)
+            self._kinds = np.concatenate([self._kinds, [m["kind"] == IMAGE for m in metadata]])
+            self._configs = np.concatenate([
+                self._configs, np.array([self._config_id(m.get("config")) for m in metadata], dtype=np.int64)
+            ])
+        return list(range(start, end))
+
+    def search(self, queries, k=5, kind=None, config=None):
+        """
+        Batched cosine top-k search.
+
+        Parameters:
+        -----------
+        queries : numpy.ndarray
+            One query vector, or a matrix with one query per row
+        k : int
+            Number of results per query
+        kind : str, optional
+            Only return "text" or "image" entries
+        config : dict, optional
+            Only return entries stored with exactly this generation config
+
+        Returns:
+        --------
+        list
+            For each query, a list of (score, metadata) sorted by score
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        count = len(self.metadata)
+        if count == 0:
+            return [[] for _ in queries]
+
+        scores = queries @ self._vectors[:count].T
+        if kind is not None:
+            scores[:, self._kinds[:count] != (kind == IMAGE)] = -np.inf
+        if config is not None:
+            config_id = self._config_ids.get(config_key(config), -1)
+            scores[:, self._configs[:count] != config_id] = -np.inf
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([
+                (float(scores[row, i]), self.metadata[i]) for i in ordered if np.isfinite(scores[row, i])
+            ])
+        return results
+
+    def find_similar(self, item, threshold=DEFAULT_THRESHOLD, kind=None, config=None):
+        """Return (score, metadata) of the closest entry to a prompt or image if it clears the threshold, else None."""
+        results = self.search(self.embed_fn(item), k=1, kind=kind, config=config)[0]
+        if results and results[0][0] >= threshold:
+            return results[0]
+        return None
+
+    def add_prompt_images(self, prompt, base64_images, metadata=None, config=None):
+        """
+        Save generated images and index them under their prompt and their pixels.
+
+        `config` is the generation config the images were made with; reuse
+        only matches entries with the same config.
+
+        Returns:
+        --------
+        list
+            Paths of the saved images
+        """
+        paths = []
+        vectors = []
+        entries = []
+        for b64_image in base64_images:
+            image_bytes = base64.b64decode(b64_image)
+            path = os.path.join(self.images_dir, f"{hashlib.blake2b(image_bytes, digest_size=16).hexdigest()}.png")
+            with open(path, "wb") as f:
+                f.write(image_bytes)
+            paths.append(path)
+            image = Image.open(io.BytesIO(image_bytes))
+            vectors.append(self.embed_fn(image))
+            entries.append({**(metadata or {}), "kind": IMAGE, "prompt": prompt, "path": path, "config": config})
+
+        vectors.append(self.embed_fn(prompt))
+        entries.append({**(metadata or {}), "kind": TEXT, "prompt": prompt, "paths": paths, "config": config})
+        self.add(np.stack(vectors), entries)
+        return paths
+
+
+def config_key(config):
+    """A canonical string for a generation config, used to match entries exactly."""
+    return json.dumps(config or {}, sort_keys=True)
+
+
+def generation_config(resolution, image_count, negative_prompt, seed=None):
+    """The Canvas request settings that must match exactly for images to be reused."""
+    return {
+        "width": resolution[0],
+        "height": resolution[1],
+        "numberOfImages": image_count,
+        "negativeText": negative_prompt,
+        "seed": seed,
+    }
+
+
+def _distinct_parts(prompt, other):
+    # Drop the words both prompts start and end with (style and character text), keep what differs
+    words, other_words = prompt.split(), other.split()
+    start = 0
+    while start < min(len(words), len(other_words)) and words[start].lower() == other_words[start].lower():
+        start += 1
+    end = 0
+    while (end < min(len(words), len(other_words)) - start
+           and words[-1 - end].lower() == other_words[-1 - end].lower()):
+        end += 1
+    return " ".join(words[start:len(words) - end]), " ".join(other_words[start:len(other_words) - end])
+
+
+def same_content(index, prompt, other, threshold=DEFAULT_THRESHOLD):
+    """
+    Check that two similar prompts also describe the same content.
+
+    Prompts that share a long style and character description score high
+    even when the scene differs, so the parts that differ are embedded and
+    compared on their own.
+    """
+    part, other_part = _distinct_parts(prompt, other)
+    if not part and not other_part:
+        return True
+    if not part or not other_part:
+        return False
+    a, b = index.embed_fn(part), index.embed_fn(other_part)
+    return float(np.dot(a, b) / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12)) >= threshold
+
+
+def reuse_or_generate(index, prompt, generate, config, threshold=DEFAULT_THRESHOLD, metadata=None):
+    """
+    Return existing images for a near-identical prompt and the same config, or generate and index new ones.
+
+    Parameters:
+    -----------
+    index : EmbeddingIndex
+        Index of previously generated images
+    prompt : str
+        The image prompt
+    generate : callable
+        Called with no arguments when nothing similar exists; returns a list of
+        base64-encoded images, e.g. `lambda: generate_images(client, model_id, prompt, negative_prompt)`
+    config : dict
+        Generation settings, e.g. from `generation_config`. Only entries
+        generated with exactly the same settings are reused
+    metadata : dict, optional
+        Extra fields stored with new entries, e.g. character and scene
+
+    Returns:
+    --------
+    list
+        Base64-encoded images, reused or newly generated
+    """
+    match = index.find_similar(prompt, threshold=threshold, kind=TEXT, config=config)
+    if (match is not None
+            and same_content(index, prompt, match[1]["prompt"], threshold)
+            and all(os.path.exists(path) for path in match[1]["paths"])):
+        print(f"Reusing {len(match[1]['paths'])} images (similarity {match[0]:.3f}) for: {prompt[:80]}")
+        images = []
+        for path in match[1]["paths"]:
+            with open(path, "rb") as f:
+                images.append(base64.b64encode(f.read()).decode("utf-8"))
+        return images
+
+    images = generate()
+    index.add_prompt_images(prompt, images, metadata, config)
+    return images
@@ -0,0 +1,126 @@
+"""
+Hedged `invoke_model` requests for tail-latency control.
+
+A `HedgedClient` wraps a `bedrock-runtime` client (or a `RegionPool`). When an
+`invoke_model` call is still running after the observed latency percentile
+for its model, a duplicate request is sent and whichever returns first wins.
+Hedges are capped at a fraction of all requests so they cannot eat the quota.
+Only `invoke_model` is hedged: `start_async_invoke` starts a new job each time
+and is passed through unchanged.
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .deadlines import DeadlineExceeded, propagate, remaining
+
+
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+DEFAULT_PERCENTILE = 95
+DEFAULT_MAX_HEDGE_FRACTION = 0.1
+
+
+class HedgedClient:
+    """
+    A `bedrock-runtime` client proxy that hedges slow `invoke_model` calls.
+
+    Parameters:
+    -----------
+    client : bedrock-runtime client
+        The client the requests are sent with
+    percentile : float, optional
+        Latency percentile, per model, after which a hedge is sent
+    max_hedge_fraction : float, optional
+        Maximum share of requests that may be hedged
+    min_samples : int, optional
+        Latencies observed for a model before hedging starts
+    max_workers : int, optional
+        Threads available for in-flight requests and hedges
+    """
+
+    def __init__(self, client, percentile=DEFAULT_PERCENTILE, max_hedge_fraction=DEFAULT_MAX_HEDGE_FRACTION,
+                 min_samples=MIN_SAMPLES, max_workers=16):
+        self.client = client
+        self.percentile = percentile
+        self.max_hedge_fraction = max_hedge_fraction
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def hedge_after(self, model_id):
+        """Return the seconds after which a call to `model_id` is hedged, or None while there are too few samples."""
+        with self._lock:
+            samples = sorted(self._latencies[model_id])
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(self.percentile / 100 * len(samples)) - 1)]
+
+    def _timed_call(self, kwargs):
+        start = time.monotonic()
+        response = self.client.invoke_model(**kwargs)
+        with self._lock:
+            self._latencies[kwargs.get("modelId")].append(time.monotonic() - start)
+        return response
+
+    def _can_hedge(self):
+        return self.hedges < self.max_hedge_fraction * self.requests
+
+    def invoke_model(self, **kwargs):
+        model_id = kwargs.get("modelId")
+        threshold = self.hedge_after(model_id)
+        with self._lock:
+            self.requests += 1
+        call = propagate(self._timed_call)
+        primary = self._executor.submit(call, kwargs)
+        pending = {primary}
+
+        limits = [t for t in (threshold, remaining()) if t is not None]
+        done, pending = wait(pending, timeout=min(limits) if limits else None)
+        if not done and threshold is not None and remaining() != 0.0:
+            with self._lock:
+                hedge = self._can_hedge()
+                if hedge:
+                    self.hedges += 1
+            if hedge:
+                pending.add(self._executor.submit(call, kwargs))
+
+        while not done:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Deadline exceeded waiting for {model_id}.")
+
+        # Prefer a successful response; only raise if every request failed
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+            if not pending:
+                raise next(iter(done)).exception()
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Deadline exceeded waiting for {model_id}.")
+
+    def stats(self):
+        """Return request and hedge counts and the current hedge threshold per model."""
+        with self._lock:
+            model_ids = list(self._latencies)
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_after": {model_id: self.hedge_after(model_id) for model_id in model_ids},
+        }
@@ -0,0 +1,183 @@
+"""
+Disk-backed storage for generated storyboard images.
+
+An `ImageStore` behaves like the `{scene_id: [images]}` dict the notebook
+builds for `display_storyboard`, but keeps the encoded images on disk and only
+a bounded number of decoded PIL images in memory, so long sessions do not
+grow with scenes x candidates x resolution.
+"""
+
+import base64
+import io
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from PIL import Image
+
+from .profiling import profiled
+
+
+DEFAULT_MAX_DECODED = 32
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class ImageStore(MutableMapping):
+    """
+    A mapping of keys to lists of images, spilled to disk as PNG files.
+
+    Values can be assigned as lists of PIL images or base64-encoded PNG strings
+    (the format returned by `generate_images`); base64 strings are written
+    as-is without re-encoding, and encoded data that is not PNG is rejected.
+    Each key gets a directory under `root_dir` that no earlier session used. Reading a key returns a list of PIL images,
+    decoded through an LRU cache holding at most `max_decoded` images.
+
+    Parameters:
+    -----------
+    root_dir : str
+        Directory the image files are written to
+    max_decoded : int, optional
+        Maximum number of decoded images kept in memory
+    """
+
+    def __init__(self, root_dir, max_decoded=DEFAULT_MAX_DECODED):
+        self.root_dir = root_dir
+        self.max_decoded = max_decoded
+        self._paths = {}
+        self._reserved = {}
+        self._next_dir = 0
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _new_key_dir(self):
+        # Skip directories left by earlier sessions so their files never mix with ours
+        with self._lock:
+            while True:
+                key_dir = os.path.join(self.root_dir, f"{self._next_dir:05d}")
+                self._next_dir += 1
+                try:
+                    os.makedirs(key_dir)
+                    return key_dir
+                except FileExistsError:
+                    continue
+
+    @profiled("ImageStore.encode")
+    def _encode(self, image):
+        if isinstance(image, (bytes, bytearray)):
+            data = bytes(image)
+        elif isinstance(image, str):
+            data = base64.b64decode(image)
+        else:
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            return buffer.getvalue()
+        if not data.startswith(PNG_SIGNATURE):
+            raise ValueError("ImageStore only stores PNG images; encoded input must be PNG data.")
+        return data
+
+    def _write(self, key_dir, images, start=0):
+        paths = []
+        for i, image in enumerate(images, start):
+            path = os.path.join(key_dir, f"{i}.png")
+            with open(path, "wb") as f:
+                f.write(self._encode(image))
+            paths.append(path)
+        return paths
+
+    def _forget(self, paths):
+        with self._lock:
+            for path in paths:
+                self._decoded.pop(path, None)
+        if paths:
+            shutil.rmtree(os.path.dirname(paths[0]), ignore_errors=True)
+
+    def __setitem__(self, key, images):
+        images = list(images)
+        key_dir = self._new_key_dir()
+        try:
+            paths = self._write(key_dir, images)
+        except Exception:
+            shutil.rmtree(key_dir, ignore_errors=True)
+            raise
+        # Swap in the new files in one step, so readers never see a half-written key
+        with self._lock:
+            old_paths = self._paths.get(key, [])
+            self._paths[key] = paths
+            self._reserved[key] = (key_dir, len(paths))
+        self._forget(old_paths)
+
+    def extend(self, key, images):
+        """Append images to a key, writing only the new ones; the stored images are left untouched."""
+        images = list(images)
+        with self._lock:
+            reserved = self._reserved.get(key)
+            if reserved is not None:
+                key_dir, start = reserved
+                # Reserve the file names, so concurrent extends of a key never overwrite each other
+                self._reserved[key] = (key_dir, start + len(images))
+        if reserved is None:
+            self[key] = images
+            return
+        paths = self._write(key_dir, images, start=start)
+        with self._lock:
+            self._paths[key].extend(paths)
+
+    def __getitem__(self, key):
+        with self._lock:
+            paths = list(self._paths[key])
+        return [self._decode(path) for path in paths]
+
+    def __delitem__(self, key):
+        with self._lock:
+            paths = self._paths.pop(key)
+            del self._reserved[key]
+        self._forget(paths)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._paths))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._paths)
+
+    @profiled("ImageStore.decode")
+    def _decode(self, path):
+        with self._lock:
+            if path in self._decoded:
+                self._decoded.move_to_end(path)
+                return self._decoded[path]
+        with Image.open(path) as image:
+            image.load()
+            decoded = image.copy()
+        with self._lock:
+            self._decoded[path] = decoded
+            while len(self._decoded) > self.max_decoded:
+                self._decoded.popitem(last=False)
+        return decoded
+
+    def paths(self, key):
+        """Return the image file paths stored for a key."""
+        with self._lock:
+            return list(self._paths[key])
+
+    def base64_images(self, key):
+        """
+        Return the images of a key as base64-encoded PNG strings, read straight from disk.
+
+        `display_images_in_row` accepts these directly, which skips decoding
+        and re-encoding the images just to display them.
+        """
+        images = []
+        for path in self.paths(key):
+            with open(path, "rb") as f:
+                images.append(base64.b64encode(f.read()).decode("utf-8"))
+        return images
+
+    def clear_cache(self):
+        """Drop every decoded image held in memory."""
+        with self._lock:
+            self._decoded.clear()
@@ -1,9 +1,27 @@
 import base64
+import hashlib
 import io
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import matplotlib.pyplot as plt
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageDraw
+
+from .profiling import profiled
+
+# Image formats Nova Reel accepts for the first frame of a video
+REFERENCE_IMAGE_FORMATS = ["png", "jpeg"]
+ENCODE_CACHE_SIZE = 64
+
+_encode_cache = OrderedDict()
+_encode_cache_lock = threading.Lock()
+
+# Comparison plots with more images than this are drawn as a single mosaic
+MOSAIC_THRESHOLD = 8
+MOSAIC_LABEL_HEIGHT = 20
 
 
 # Define function to save the output
@@ -13,6 +31,141 @@ def save_image(base64_image, output_file):
     image.save(output_file)
 
 
+def image_digest(pil_image):
+    """Return a digest of the pixels of a PIL image, used to recognise the same frame."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{pil_image.mode}:{pil_image.size}".encode())
+    digest.update(pil_image.tobytes())
+    return digest.hexdigest()
+
+
+def _encode(pil_image, image_format, jpeg_quality):
+    buffer = io.BytesIO()
+    if image_format == "jpeg":
+        pil_image.convert("RGB").save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+    else:
+        pil_image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+@profiled()
+def encode_reference_image(pil_image, formats=REFERENCE_IMAGE_FORMATS, jpeg_quality=95):
+    """
+    Encode a reference or conditioning image for a request payload.
+
+    Every allowed format is tried and the smallest encoding is kept. Results
+    are cached by pixel digest, so resubmitting the same frame after a retry
+    or for another variant does not encode it again. JPEG is only tried for
+    images without transparency.
+
+    Args:
+        pil_image (PIL.Image): The image to encode
+        formats (list): Allowed formats, any of "png" and "jpeg"
+        jpeg_quality (int): JPEG quality used when "jpeg" is allowed
+
+    Returns:
+        tuple: (format, base64-encoded string)
+    """
+    key = (image_digest(pil_image), tuple(formats), jpeg_quality)
+    with _encode_cache_lock:
+        if key in _encode_cache:
+            _encode_cache.move_to_end(key)
+            return _encode_cache[key]
+
+    if pil_image.mode in ("RGBA", "LA") or "transparency" in pil_image.info:
+        formats = [f for f in formats if f != "jpeg"] or ["png"]
+    encodings = {f: _encode(pil_image, f, jpeg_quality) for f in formats}
+    image_format = min(encodings, key=lambda f: len(encodings[f]))
+    result = (image_format, base64.b64encode(encodings[image_format]).decode("utf-8"))
+
+    with _encode_cache_lock:
+        _encode_cache[key] = result
+        while len(_encode_cache) > ENCODE_CACHE_SIZE:
+            _encode_cache.popitem(last=False)
+    return result
+
+
+@profiled()
+def encode_reference_images(pil_images, formats=REFERENCE_IMAGE_FORMATS, jpeg_quality=95, max_workers=4):
+    """Encode several images with `encode_reference_image` in a thread pool, keeping their order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda img: encode_reference_image(img, formats, jpeg_quality), pil_images))
+
+
+def _to_pil_image(image):
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, str):
+        return Image.open(image)
+    return Image.fromarray(np.asarray(image))
+
+
+@profiled()
+def build_image_mosaic(images, labels=None, columns=None, cell_size=(256, 256), padding=4):
+    """
+    Downsample images and compose them into a single labelled grid.
+
+    Args:
+        images (list): PIL images, NumPy arrays or image file paths
+        labels (list): Optional caption drawn above each image
+        columns (int): Number of columns, defaults to at most 6
+        cell_size (tuple): Maximum (width, height) of each downsampled image
+        padding (int): Space in pixels between cells
+
+    Returns:
+        numpy.ndarray: The mosaic as an RGB uint8 array
+    """
+    num_images = len(images)
+    columns = columns or min(num_images, 6)
+    rows = math.ceil(num_images / columns)
+    cell_width, cell_height = cell_size
+    label_height = MOSAIC_LABEL_HEIGHT if labels else 0
+    row_height = label_height + cell_height + padding
+    column_width = cell_width + padding
+
+    mosaic = np.full((rows * row_height + padding, columns * column_width + padding, 3), 255, dtype=np.uint8)
+    for i, image in enumerate(images):
+        thumbnail = _to_pil_image(image).convert("RGB")
+        thumbnail.thumbnail(cell_size, reducing_gap=2.0)
+        pixels = np.asarray(thumbnail)
+        top = (i // columns) * row_height + padding + label_height + (cell_height - pixels.shape[0]) // 2
+        left = (i % columns) * column_width + padding + (cell_width - pixels.shape[1]) // 2
+        mosaic[top : top + pixels.shape[0], left : left + pixels.shape[1]] = pixels
+
+    if labels:
+        canvas = Image.fromarray(mosaic)
+        draw = ImageDraw.Draw(canvas)
+        for i, label in enumerate(labels[:num_images]):
+            x = (i % columns) * column_width + padding
+            y = (i // columns) * row_height + padding + 2
+            draw.text((x, y), str(label), fill=(0, 0, 0))
+        mosaic = np.asarray(canvas)
+    return mosaic
+
+
+@profiled()
+def plot_image_mosaic(images, labels=None, columns=None, cell_size=(256, 256), prompt=None, output_file=None):
+    """
+    Render a grid of images once, as a single mosaic.
+
+    When `output_file` is set the mosaic is written straight to a PNG file
+    without going through matplotlib; otherwise it is shown as one image.
+    """
+    mosaic = build_image_mosaic(images, labels=labels, columns=columns, cell_size=cell_size)
+    if prompt:
+        print(f"Prompt: {prompt}\n")
+    if output_file:
+        Image.fromarray(mosaic).save(output_file)
+        return output_file
+
+    height, width = mosaic.shape[:2]
+    plt.figure(figsize=(width / 100, height / 100), dpi=100)
+    plt.imshow(mosaic)
+    plt.axis("off")
+    plt.tight_layout(pad=0)
+    plt.show()
+
+
 # Define different types of plot function
 def plot_images(
     generated_images, ref_image_path=None, original_title=None, processed_title=None
@@ -48,6 +201,20 @@ def plot_image_conditioning(
     control_strength_values=None,
     comparison_mode=False,
 ):
+    if comparison_mode and len(control_strength_values) > MOSAIC_THRESHOLD:
+        if generated_images is None or len(generated_images) != len(
+            control_strength_values
+        ):
+            raise ValueError(
+                "The length of generated_images must match the length of control_strength_values."
+            )
+        plot_image_mosaic(
+            [ref_image_path] + list(generated_images),
+            labels=["Condition Image"] + [f"Control Strength: {s}" for s in control_strength_values],
+            prompt=prompt,
+        )
+        return
+
     if comparison_mode:
         num_images = len(control_strength_values) + 1
         fig, axes = plt.subplots(1, num_images, figsize=((num_images) * 4, 5))
@@ -192,6 +359,18 @@ def plot_images_for_comparison(
     comparison_mode=False,
     title_prefix="Image",
 ):
+    if comparison_mode and len(generated_images) > MOSAIC_THRESHOLD:
+        mosaic_images = list(generated_images)
+        mosaic_labels = [
+            f"{title_prefix} {labels[i]}" if labels else f"{title_prefix} {i+1}"
+            for i in range(len(generated_images))
+        ]
+        if ref_image_path:
+            mosaic_images.insert(0, ref_image_path)
+            mosaic_labels.insert(0, "Reference Image")
+        plot_image_mosaic(mosaic_images, labels=mosaic_labels, prompt=prompt)
+        return
+
     if comparison_mode:
         num_images = len(generated_images) + (1 if ref_image_path else 0)
         _, axes = plt.subplots(1, num_images, figsize=(num_images * 4, 5))
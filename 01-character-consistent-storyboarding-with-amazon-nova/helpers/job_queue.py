@@ -0,0 +1,366 @@
+"""
+A local, SQLite-backed queue for generating several storyboards at once.
+
+A job is one storyboard, made of tasks (one model call each). Worker
+processes claim tasks from the shared database file, so every run on the
+machine draws from the same per-model concurrency budget. Jobs are scheduled
+with stride scheduling: each claim advances the job's "pass" by 1 / priority
+and the job with the lowest pass goes next, so a 200-scene story cannot starve
+a 5-scene one and a priority 2 job gets twice the turns of a priority 1 job.
+
+Failed tasks are retried after an exponential backoff. Throttled attempts do
+not count towards a task's attempt limit, since throttling on the shared quota
+is what the queue is expected to ride out. Workers also put back tasks left
+running by a worker process that died.
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+
+DEFAULT_MAX_CONCURRENCY = 2
+DEFAULT_MAX_ATTEMPTS = 3
+POLL_INTERVAL = 1.0
+RETRY_BACKOFF = 5
+MAX_RETRY_BACKOFF = 300
+# Longer than the 5 minute read timeout of a model call, with room for its retries
+STALE_TASK_TIMEOUT = 15 * 60
+
+THROTTLING_ERROR_CODES = [
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    priority REAL NOT NULL,
+    pass REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    seq INTEGER NOT NULL,
+    model_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    throttles INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    started_at REAL,
+    finished_at REAL,
+    not_before REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status, model_id);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks(job_id, status);
+CREATE TABLE IF NOT EXISTS model_budgets (
+    model_id TEXT PRIMARY KEY,
+    max_concurrency INTEGER NOT NULL
+);
+"""
+
+# Pending tasks whose model still has budget, from the job with the lowest pass first
+CLAIM_QUERY = """
+SELECT t.id, t.job_id, t.model_id, t.payload, j.priority
+FROM tasks t JOIN jobs j ON j.id = t.job_id
+WHERE t.status = 'pending'
+  AND t.not_before <= ?
+  AND (SELECT COUNT(*) FROM tasks r WHERE r.status = 'running' AND r.model_id = t.model_id)
+      < COALESCE((SELECT max_concurrency FROM model_budgets b WHERE b.model_id = t.model_id), ?)
+ORDER BY j.pass, j.created_at, t.seq
+LIMIT 1
+"""
+
+
+class JobQueue:
+    """
+    Storyboard jobs and their tasks, stored in a SQLite file shared by all workers.
+
+    Parameters:
+    -----------
+    db_path : str
+        Path of the SQLite database file
+    default_max_concurrency : int, optional
+        Concurrent calls allowed per model that has no budget set with `set_model_budget`
+    """
+
+    def __init__(self, db_path, default_max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.db_path = db_path
+        self.default_max_concurrency = default_max_concurrency
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same task
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def set_model_budget(self, model_id, max_concurrency):
+        """Set how many calls to a model may run at once across every worker."""
+        self._conn.execute(
+            "INSERT INTO model_budgets (model_id, max_concurrency) VALUES (?, ?) "
+            "ON CONFLICT(model_id) DO UPDATE SET max_concurrency = excluded.max_concurrency",
+            (model_id, max_concurrency),
+        )
+
+    def submit_job(self, name, tasks, priority=1):
+        """
+        Add a storyboard job.
+
+        Parameters:
+        -----------
+        name : str
+            Name of the story, shown in the status
+        tasks : list
+            One dict per model call, with "model_id" and a JSON-serializable "payload"
+        priority : float, optional
+            Relative share of turns the job gets, higher is sooner
+
+        Returns:
+        --------
+        int
+            The job id
+        """
+        if priority <= 0:
+            raise ValueError("priority must be greater than 0.")
+        conn = self._transaction()
+        try:
+            # New jobs start level with the active ones instead of jumping ahead of them
+            row = conn.execute(
+                "SELECT MIN(j.pass) FROM jobs j WHERE EXISTS "
+                "(SELECT 1 FROM tasks t WHERE t.job_id = j.id AND t.status IN ('pending', 'running'))"
+            ).fetchone()
+            start_pass = row[0] or 0.0
+            job_id = conn.execute(
+                "INSERT INTO jobs (name, priority, pass, created_at) VALUES (?, ?, ?, ?)",
+                (name, priority, start_pass, time.time()),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO tasks (job_id, seq, model_id, payload) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, task["model_id"], json.dumps(task["payload"])) for seq, task in enumerate(tasks)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim_task(self, worker):
+        """Claim the next task for a worker, or return None when nothing can run right now."""
+        conn = self._transaction()
+        try:
+            row = conn.execute(CLAIM_QUERY, (time.time(), self.default_max_concurrency)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (worker, time.time(), row["id"]),
+            )
+            conn.execute("UPDATE jobs SET pass = pass + 1.0 / priority WHERE id = ?", (row["job_id"],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {
+            "task_id": row["id"],
+            "job_id": row["job_id"],
+            "model_id": row["model_id"],
+            "payload": json.loads(row["payload"]),
+        }
+
+    def complete_task(self, task_id, result):
+        self._conn.execute(
+            "UPDATE tasks SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+            (json.dumps(result), time.time(), task_id),
+        )
+
+    def fail_task(self, task_id, error, max_attempts=DEFAULT_MAX_ATTEMPTS, throttled=False):
+        """
+        Record a failed attempt; the task goes back to pending until it has used max_attempts.
+
+        Retries wait RETRY_BACKOFF seconds, doubled per failed try (throttled or
+        not) up to MAX_RETRY_BACKOFF. A throttled attempt is retried without using
+        up an attempt; it is counted in `throttles` instead, so the delay still grows.
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            row = conn.execute("SELECT attempts, throttles FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            attempts = row["attempts"] - 1 if throttled else row["attempts"]
+            throttles = row["throttles"] + 1 if throttled else row["throttles"]
+            delay = min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** max(0, attempts + throttles - 1))
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN ? < ? THEN 'pending' ELSE 'failed' END, "
+                "attempts = ?, throttles = ?, error = ?, finished_at = ?, not_before = ?, worker = NULL WHERE id = ?",
+                (attempts, max_attempts, attempts, throttles, str(error), now, now + delay, task_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def requeue_stale(self, timeout):
+        """Put back tasks that have been running longer than `timeout` seconds, e.g. after a worker crashed."""
+        return self._conn.execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL WHERE status = 'running' AND started_at < ?",
+            (time.time() - timeout,),
+        ).rowcount
+
+    def has_unfinished_tasks(self):
+        row = self._conn.execute("SELECT 1 FROM tasks WHERE status IN ('pending', 'running') LIMIT 1").fetchone()
+        return row is not None
+
+    def results(self, job_id):
+        """Return the results of a job's finished tasks, in task order (None for unfinished tasks)."""
+        rows = self._conn.execute("SELECT result FROM tasks WHERE job_id = ? ORDER BY seq", (job_id,)).fetchall()
+        return [json.loads(row["result"]) if row["result"] is not None else None for row in rows]
+
+    def job_status(self, job_id):
+        """Return the progress of one job."""
+        job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            raise KeyError(f"No job with id {job_id}")
+        counts = dict(
+            self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        )
+        total = sum(counts.values())
+        if counts.get("pending") or counts.get("running"):
+            state = "running" if counts.get("running") or counts.get("done") else "queued"
+        else:
+            state = "failed" if counts.get("failed") else "done"
+        return {
+            "job_id": job_id,
+            "name": job["name"],
+            "priority": job["priority"],
+            "status": state,
+            "total": total,
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+        }
+
+    def status(self):
+        """Return the queue depth, running calls per model and the progress of every job."""
+        per_model = {}
+        for model_id, state, count in self._conn.execute(
+            "SELECT model_id, status, COUNT(*) FROM tasks WHERE status IN ('pending', 'running') GROUP BY model_id, status"
+        ).fetchall():
+            per_model.setdefault(model_id, {"pending": 0, "running": 0})[state] = count
+        job_ids = [row[0] for row in self._conn.execute("SELECT id FROM jobs ORDER BY id").fetchall()]
+        return {
+            "queue_depth": sum(m["pending"] for m in per_model.values()),
+            "running": sum(m["running"] for m in per_model.values()),
+            "per_model": per_model,
+            "jobs": [self.job_status(job_id) for job_id in job_ids],
+        }
+
+
+def _is_throttling(error):
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+def _worker_loop(db_path, handler, default_max_concurrency, max_attempts, poll_interval, stale_timeout):
+    queue = JobQueue(db_path, default_max_concurrency)
+    worker = f"{os.uname().nodename}:{os.getpid()}"
+    try:
+        while True:
+            task = queue.claim_task(worker)
+            if task is None:
+                # Tasks of a worker that died stay running until they are put back
+                if queue.requeue_stale(stale_timeout):
+                    continue
+                if not queue.has_unfinished_tasks():
+                    return
+                # Every pending task is waiting for model budget or for its retry backoff
+                time.sleep(poll_interval)
+                continue
+            try:
+                result = handler(task["model_id"], task["payload"])
+            except Exception as e:
+                print(f"Task {task['task_id']} of job {task['job_id']} failed: {str(e)}")
+                queue.fail_task(task["task_id"], e, max_attempts, throttled=_is_throttling(e))
+            else:
+                queue.complete_task(task["task_id"], result)
+    finally:
+        queue.close()
+
+
+def run_workers(db_path, handler, num_workers=4, default_max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                max_attempts=DEFAULT_MAX_ATTEMPTS, poll_interval=POLL_INTERVAL, stale_timeout=STALE_TASK_TIMEOUT,
+                wait=True):
+    """
+    Start worker processes that run queued tasks until the queue is empty.
+
+    Parameters:
+    -----------
+    handler : callable
+        `handler(model_id, payload)` returning a JSON-serializable result, e.g.
+        `invoke_model_task`. It must be importable from a module so it can be
+        sent to the worker processes.
+    stale_timeout : float, optional
+        Seconds after which a running task is assumed lost with its worker
+        and is put back in the queue
+    wait : bool, optional
+        Wait for the workers to finish, otherwise return the running processes
+
+    Returns:
+    --------
+    list
+        The worker processes
+    """
+    workers = [
+        multiprocessing.Process(
+            target=_worker_loop,
+            args=(db_path, handler, default_max_concurrency, max_attempts, poll_interval, stale_timeout),
+            daemon=True,
+        )
+        for _ in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    if wait:
+        for worker in workers:
+            worker.join()
+    return workers
+
+
+_runtime_client = None
+
+
+def invoke_model_task(model_id, payload):
+    """
+    Default task handler: send `payload` as the body of an `invoke_model` call.
+
+    Each worker process creates its own `bedrock-runtime` client on first use,
+    in the region set by AWS_REGION (us-east-1 by default).
+    """
+    global _runtime_client
+    if _runtime_client is None:
+        _runtime_client = boto3.client(
+            "bedrock-runtime",
+            region_name=os.environ.get("AWS_REGION", "us-east-1"),
+            config=Config(read_timeout=5 * 60),
+        )
+    response = _runtime_client.invoke_model(modelId=model_id, body=json.dumps(payload))
+    return json.loads(response["body"].read())
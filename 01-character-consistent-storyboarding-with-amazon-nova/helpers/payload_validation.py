@@ -0,0 +1,267 @@
+"""
+Local pre-flight validation for Amazon Bedrock request payloads.
+
+Requests that can never succeed (prompts over the length limit, seeds out of
+range, unsupported resolutions, ...) are rejected here, before they are sent
+over the network and retried by the helpers in `bedrock_helpers.py`.
+"""
+
+CANVAS_MAX_SEED = 858993459
+REEL_MAX_SEED = 2147483646
+
+CANVAS_MAX_TEXT_LENGTH = 1024
+REEL_MAX_TEXT_LENGTH = 512
+
+CANVAS_MIN_SIDE = 320
+CANVAS_MAX_SIDE = 4096
+CANVAS_SIDE_MULTIPLE = 16
+CANVAS_MAX_PIXELS = 4194304
+CANVAS_MAX_ASPECT_RATIO = 4.0
+
+REEL_DIMENSIONS = ["1280x720"]
+REEL_FPS = [24]
+REEL_SHOT_DURATION = 6
+REEL_IMAGE_FORMATS = ["png", "jpeg"]
+REEL_MIN_SHOTS = 2
+REEL_MAX_SHOTS = 20
+REEL_MULTI_SHOT_MAX_TEXT_LENGTH = 4000
+REEL_MULTI_SHOT_MIN_DURATION = 12
+REEL_MULTI_SHOT_MAX_DURATION = 120
+# Model versions that only accept TEXT_VIDEO (multi-shot needs amazon.nova-reel-v1:1)
+REEL_SINGLE_SHOT_MODELS = ["amazon.nova-reel-v1:0"]
+
+
+class PayloadValidationError(ValueError):
+    """Raised when a request payload violates a model limit."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Invalid request payload:\n  " + "\n  ".join(errors))
+
+
+# Each schema maps a dotted field path to the rule that field must satisfy.
+# Fields marked "required" must be present; all other fields are checked only
+# when they are set.
+CANVAS_TEXT_IMAGE_SCHEMA = {
+    "taskType": {"required": True, "choices": ["TEXT_IMAGE"]},
+    "textToImageParams.text": {"required": True, "type": str, "min_length": 1, "max_length": CANVAS_MAX_TEXT_LENGTH},
+    "textToImageParams.negativeText": {"type": str, "min_length": 1, "max_length": CANVAS_MAX_TEXT_LENGTH},
+    "imageGenerationConfig.numberOfImages": {"type": int, "min": 1, "max": 5},
+    "imageGenerationConfig.seed": {"type": int, "min": 0, "max": CANVAS_MAX_SEED},
+    "imageGenerationConfig.cfgScale": {"type": (int, float), "min": 1.1, "max": 10},
+    "imageGenerationConfig.quality": {"choices": ["standard", "premium"]},
+    "imageGenerationConfig.width": {"type": int, "min": CANVAS_MIN_SIDE, "max": CANVAS_MAX_SIDE, "multiple_of": CANVAS_SIDE_MULTIPLE},
+    "imageGenerationConfig.height": {"type": int, "min": CANVAS_MIN_SIDE, "max": CANVAS_MAX_SIDE, "multiple_of": CANVAS_SIDE_MULTIPLE},
+}
+
+REEL_TEXT_VIDEO_SCHEMA = {
+    "taskType": {"required": True, "choices": ["TEXT_VIDEO"]},
+    "textToVideoParams.text": {"required": True, "type": str, "min_length": 1, "max_length": REEL_MAX_TEXT_LENGTH},
+    "textToVideoParams.images": {"type": list, "min_length": 1, "max_length": 1},
+    "videoGenerationConfig.durationSeconds": {"required": True, "type": int, "choices": [REEL_SHOT_DURATION]},
+    "videoGenerationConfig.fps": {"type": int, "choices": REEL_FPS},
+    "videoGenerationConfig.dimension": {"choices": REEL_DIMENSIONS},
+    "videoGenerationConfig.seed": {"type": int, "min": 0, "max": REEL_MAX_SEED},
+}
+
+REEL_MULTI_SHOT_MANUAL_SCHEMA = {
+    "taskType": {"required": True, "choices": ["MULTI_SHOT_MANUAL"]},
+    "multiShotManualParams.shots": {"required": True, "type": list, "min_length": REEL_MIN_SHOTS, "max_length": REEL_MAX_SHOTS},
+    "videoGenerationConfig.fps": {"type": int, "choices": REEL_FPS},
+    "videoGenerationConfig.dimension": {"choices": REEL_DIMENSIONS},
+    "videoGenerationConfig.seed": {"type": int, "min": 0, "max": REEL_MAX_SEED},
+}
+
+# Applied to each entry of multiShotManualParams.shots
+REEL_SHOT_SCHEMA = {
+    "text": {"required": True, "type": str, "min_length": 1, "max_length": REEL_MAX_TEXT_LENGTH},
+}
+
+REEL_MULTI_SHOT_AUTOMATED_SCHEMA = {
+    "taskType": {"required": True, "choices": ["MULTI_SHOT_AUTOMATED"]},
+    "multiShotAutomatedParams.text": {"required": True, "type": str, "min_length": 1, "max_length": REEL_MULTI_SHOT_MAX_TEXT_LENGTH},
+    "videoGenerationConfig.durationSeconds": {
+        "required": True, "type": int, "min": REEL_MULTI_SHOT_MIN_DURATION, "max": REEL_MULTI_SHOT_MAX_DURATION,
+        "multiple_of": REEL_SHOT_DURATION,
+    },
+    "videoGenerationConfig.fps": {"type": int, "choices": REEL_FPS},
+    "videoGenerationConfig.dimension": {"choices": REEL_DIMENSIONS},
+    "videoGenerationConfig.seed": {"type": int, "min": 0, "max": REEL_MAX_SEED},
+}
+
+NOVA_TEXT_SCHEMA = {
+    "messages": {"required": True, "type": list, "min_length": 1},
+    "inferenceConfig.max_new_tokens": {"type": int, "min": 1, "max": 5000},
+    "inferenceConfig.temperature": {"type": (int, float), "min": 0, "max": 1},
+    "inferenceConfig.topP": {"type": (int, float), "min": 0, "max": 1},
+}
+
+ANTHROPIC_TEXT_SCHEMA = {
+    "anthropic_version": {"required": True, "type": str},
+    "messages": {"required": True, "type": list, "min_length": 1},
+    "max_tokens": {"required": True, "type": int, "min": 1, "max": 64000},
+    "temperature": {"type": (int, float), "min": 0, "max": 1},
+    "top_p": {"type": (int, float), "min": 0, "max": 1},
+    "top_k": {"type": int, "min": 0, "max": 500},
+}
+
+_MISSING = object()
+
+
+def _get_field(payload, path):
+    value = payload
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def _check_rule(path, value, rule):
+    errors = []
+    expected_type = rule.get("type")
+    # bool is an int subclass, but True is never a valid seed or image count
+    if expected_type and (not isinstance(value, expected_type) or isinstance(value, bool)):
+        errors.append(f"{path}: expected {expected_type}, got {type(value).__name__}")
+        return errors
+    if "choices" in rule and value not in rule["choices"]:
+        errors.append(f"{path}: {value!r} is not one of {rule['choices']}")
+    if "min_length" in rule and len(value) < rule["min_length"]:
+        errors.append(f"{path}: length {len(value)} is below the minimum of {rule['min_length']}")
+    if "max_length" in rule and len(value) > rule["max_length"]:
+        errors.append(f"{path}: length {len(value)} exceeds the maximum of {rule['max_length']}")
+    if "min" in rule and value < rule["min"]:
+        errors.append(f"{path}: {value} is below the minimum of {rule['min']}")
+    if "max" in rule and value > rule["max"]:
+        errors.append(f"{path}: {value} exceeds the maximum of {rule['max']}")
+    if "multiple_of" in rule and value % rule["multiple_of"] != 0:
+        errors.append(f"{path}: {value} is not a multiple of {rule['multiple_of']}")
+    return errors
+
+
+def check_schema(payload, schema):
+    """
+    Check a payload against a field schema and return the list of violations.
+
+    Parameters:
+    -----------
+    payload : dict
+        The request body, before it is serialized with `json.dumps`
+    schema : dict
+        Mapping of dotted field paths to rules
+
+    Returns:
+    --------
+    list
+        Human readable error messages, empty when the payload is valid
+    """
+    errors = []
+    for path, rule in schema.items():
+        value = _get_field(payload, path)
+        if value is _MISSING:
+            if rule.get("required"):
+                errors.append(f"{path}: missing required field")
+            continue
+        errors.extend(_check_rule(path, value, rule))
+    return errors
+
+
+def _check_canvas_dimensions(payload):
+    width, height = _get_field(payload, "imageGenerationConfig.width"), _get_field(payload, "imageGenerationConfig.height")
+    if not isinstance(width, int) or not isinstance(height, int) or width <= 0 or height <= 0:
+        return []
+
+    errors = []
+    if width * height > CANVAS_MAX_PIXELS:
+        errors.append(f"imageGenerationConfig: {width}x{height} exceeds {CANVAS_MAX_PIXELS} total pixels")
+    if max(width, height) / min(width, height) > CANVAS_MAX_ASPECT_RATIO:
+        errors.append(f"imageGenerationConfig: {width}x{height} is outside the 1:4 to 4:1 aspect ratio range")
+    return errors
+
+
+def _type_error(path, value, expected=dict):
+    return f"{path}: expected {expected}, got {type(value).__name__}"
+
+
+def _check_image(path, image):
+    if not isinstance(image, dict):
+        return [_type_error(path, image)]
+    errors = []
+    if image.get("format") not in REEL_IMAGE_FORMATS:
+        errors.append(f"{path}.format: {image.get('format')!r} is not one of {REEL_IMAGE_FORMATS}")
+    source = image.get("source")
+    if not isinstance(source, dict):
+        errors.append(_type_error(f"{path}.source", source))
+    elif not source.get("bytes") and not source.get("s3Location"):
+        errors.append(f"{path}.source: no image bytes or s3Location")
+    return errors
+
+
+def _check_reel_images(payload):
+    errors = []
+    images = _get_field(payload, "textToVideoParams.images")
+    # A wrong type for the list itself is reported by the schema
+    if not isinstance(images, list):
+        return errors
+    for i, image in enumerate(images):
+        errors.extend(_check_image(f"textToVideoParams.images[{i}]", image))
+    return errors
+
+
+def _check_reel_shots(payload):
+    errors = []
+    shots = _get_field(payload, "multiShotManualParams.shots")
+    if not isinstance(shots, list):
+        return errors
+    for i, shot in enumerate(shots):
+        if not isinstance(shot, dict):
+            errors.append(_type_error(f"multiShotManualParams.shots[{i}]", shot))
+            continue
+        errors.extend(f"multiShotManualParams.shots[{i}].{error}" for error in check_schema(shot, REEL_SHOT_SCHEMA))
+        if "image" in shot:
+            errors.extend(_check_image(f"multiShotManualParams.shots[{i}].image", shot["image"]))
+    return errors
+
+
+def validate_canvas_request(payload):
+    """
+    Validate a Nova Canvas TEXT_IMAGE request body, raising PayloadValidationError on failure.
+    """
+    errors = check_schema(payload, CANVAS_TEXT_IMAGE_SCHEMA) + _check_canvas_dimensions(payload)
+    if errors:
+        raise PayloadValidationError(errors)
+    return payload
+
+
+def validate_reel_request(model_input, model_id=None):
+    """
+    Validate a Nova Reel `modelInput` (TEXT_VIDEO, MULTI_SHOT_MANUAL or
+    MULTI_SHOT_AUTOMATED), raising PayloadValidationError on failure.
+
+    When `model_id` is given, multi-shot tasks are rejected for model versions
+    that do not support them.
+    """
+    task_type = model_input.get("taskType")
+    if (task_type in ("MULTI_SHOT_MANUAL", "MULTI_SHOT_AUTOMATED") and model_id is not None
+            and any(model_id.endswith(single_shot) for single_shot in REEL_SINGLE_SHOT_MODELS)):
+        raise PayloadValidationError([f"taskType: {task_type} is not supported by {model_id}, use amazon.nova-reel-v1:1"])
+    if task_type == "MULTI_SHOT_MANUAL":
+        errors = check_schema(model_input, REEL_MULTI_SHOT_MANUAL_SCHEMA) + _check_reel_shots(model_input)
+    elif task_type == "MULTI_SHOT_AUTOMATED":
+        errors = check_schema(model_input, REEL_MULTI_SHOT_AUTOMATED_SCHEMA)
+    else:
+        errors = check_schema(model_input, REEL_TEXT_VIDEO_SCHEMA) + _check_reel_images(model_input)
+    if errors:
+        raise PayloadValidationError(errors)
+    return model_input
+
+
+def validate_text_request(body):
+    """
+    Validate a Nova or Anthropic text request body, raising PayloadValidationError on failure.
+    """
+    schema = ANTHROPIC_TEXT_SCHEMA if "anthropic_version" in body else NOVA_TEXT_SCHEMA
+    errors = check_schema(body, schema)
+    if errors:
+        raise PayloadValidationError(errors)
+    return body
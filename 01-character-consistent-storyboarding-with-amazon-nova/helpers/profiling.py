@@ -0,0 +1,266 @@
+"""
+Opt-in, stage-level profiling of storyboard runs.
+
+Helper functions are marked as pipeline stages with `@profiled`. While no
+profiler is running the decorator only adds a single check per call. Inside
+a `profile_run` block every stage records, per call:
+
+- wall time and CPU time of the calling thread,
+- time spent sleeping in retry and polling loops (see `deadlines.sleep`),
+- peak memory allocated while the stage ran, measured with tracemalloc.
+
+Network time shows up as the wall time of the client stages added by
+`profile_client`. At the end of the run a JSON report and a collapsed-stack
+file (`stage;substage self_time_us` per line, the input of flamegraph.pl and
+speedscope) are written to the output directory.
+
+    with profile_run("output/profile"):
+        bedrock_runtime_client = profile_client(bedrock_runtime_client, "bedrock-runtime")
+        images = generate_images(bedrock_runtime_client, ...)
+
+Peak memory is process-wide: stages that run concurrently in worker threads
+see each other's allocations, so their peaks are upper bounds.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+
+_profiler = None
+_stack = contextvars.ContextVar("profiling_stack", default=())
+
+
+class _Frame:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.thread = threading.get_ident()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        self.start_memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.peak_memory = self.start_memory
+        self.child_wall = 0.0
+        self.sleep = 0.0
+
+
+class Profiler:
+    """
+    Collects stage timings and memory peaks for one run.
+
+    Parameters:
+    -----------
+    trace_memory : bool, optional
+        Track peak allocations with tracemalloc. This slows down allocation
+        heavy code (image decoding) noticeably, so it can be turned off.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "wall": 0.0, "cpu": 0.0, "sleep": 0.0, "peak_memory": 0,
+        })
+        self.collapsed = defaultdict(float)
+        self.started = None
+        self.wall = None
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        # Open stages of every thread, so resetting the peak never loses another thread's maximum
+        self._open_frames = set()
+
+    def start(self):
+        self.started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        self.wall = time.perf_counter() - self.started
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _update_peak(self):
+        # reset_peak is process-wide and lets each stage measure its own peak; the
+        # running maximum is first carried into every open stage, in every thread,
+        # so resetting never hides a peak. Called with self._lock held.
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open_frames:
+            frame.peak_memory = max(frame.peak_memory, peak)
+        tracemalloc.reset_peak()
+
+    def enter(self, name):
+        frames = _stack.get()
+        path = frames[-1].path + (name,) if frames else (name,)
+        with self._lock:
+            self._update_peak()
+            frame = _Frame(name, path)
+            self._open_frames.add(frame)
+        return frame, _stack.set(frames + (frame,))
+
+    def exit(self, frame, token, failed=False):
+        wall = time.perf_counter() - frame.start_wall
+        cpu = time.thread_time() - frame.start_cpu
+        _stack.reset(token)
+        parents = _stack.get()
+        with self._lock:
+            self._update_peak()
+            self._open_frames.discard(frame)
+        if parents and parents[-1].thread == frame.thread:
+            # Only same-thread children are subtracted: concurrent children overlap their parent
+            parents[-1].child_wall += wall
+
+        with self._lock:
+            stage = self.stages[frame.name]
+            stage["calls"] += 1
+            stage["errors"] += int(failed)
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+            stage["sleep"] += frame.sleep
+            stage["peak_memory"] = max(stage["peak_memory"], frame.peak_memory - frame.start_memory)
+            self.collapsed[";".join(frame.path)] += max(0.0, wall - frame.child_wall)
+
+    def record_sleep(self, seconds):
+        for frame in _stack.get():
+            frame.sleep += seconds
+
+    def report(self):
+        """Return the stages sorted by total wall time, with the run's wall time."""
+        with self._lock:
+            stages = {name: dict(stats) for name, stats in self.stages.items()}
+        for stats in stages.values():
+            stats["wall_per_call"] = stats["wall"] / stats["calls"]
+            # Time neither on the CPU nor asleep: network, disk and waiting on other threads
+            stats["waiting"] = max(0.0, stats["wall"] - stats["cpu"] - stats["sleep"])
+        return {
+            "wall": self.wall if self.wall is not None else time.perf_counter() - self.started,
+            "stages": dict(sorted(stages.items(), key=lambda item: -item[1]["wall"])),
+        }
+
+    def write_report(self, output_dir):
+        """
+        Write `profile.json` and `profile.collapsed` to `output_dir`.
+
+        Returns:
+        --------
+        tuple
+            Paths of the JSON report and of the collapsed-stack file
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        report_path = os.path.join(output_dir, "profile.json")
+        collapsed_path = os.path.join(output_dir, "profile.collapsed")
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        with self._lock:
+            collapsed = dict(self.collapsed)
+        with open(collapsed_path, "w") as f:
+            for path, seconds in sorted(collapsed.items()):
+                f.write(f"{path} {int(seconds * 1e6)}\n")
+        return report_path, collapsed_path
+
+    def print_report(self, limit=20):
+        report = self.report()
+        print(f"Run wall time: {report['wall']:.2f}s")
+        print(f"{'stage':<40} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'sleep s':>9} {'wait s':>9} {'peak MB':>9}")
+        for name, stats in list(report["stages"].items())[:limit]:
+            print(
+                f"{name[:40]:<40} {stats['calls']:>6} {stats['wall']:>9.2f} {stats['cpu']:>9.2f} "
+                f"{stats['sleep']:>9.2f} {stats['waiting']:>9.2f} {stats['peak_memory'] / 2**20:>9.1f}"
+            )
+
+
+@contextlib.contextmanager
+def profile_run(output_dir=None, trace_memory=True, print_report=True):
+    """
+    Profile every stage called inside the `with` block.
+
+    When `output_dir` is set, the report and collapsed-stack file are written
+    there at the end of the block, even if the run failed.
+    """
+    global _profiler
+    if _profiler is not None:
+        raise RuntimeError("A profiling run is already active.")
+    profiler = Profiler(trace_memory=trace_memory)
+    profiler.start()
+    _profiler = profiler
+    try:
+        with stage("run"):
+            yield profiler
+    finally:
+        _profiler = None
+        profiler.stop()
+        if output_dir is not None:
+            report_path, collapsed_path = profiler.write_report(output_dir)
+            print(f"Profile written to {report_path} and {collapsed_path}")
+        if print_report:
+            profiler.print_report()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Record the code in the `with` block as a stage of the active profiling run, if any."""
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    frame, token = profiler.enter(name)
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        profiler.exit(frame, token, failed)
+
+
+def profiled(name=None):
+    """Decorator that records each call of a function as a stage, named after the function by default."""
+
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return fn(*args, **kwargs)
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_sleep(seconds):
+    """Attribute `seconds` of sleep to the current stages. Called by `deadlines.sleep`."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.record_sleep(seconds)
+
+
+class ProfiledClient:
+    """A client proxy that records every method call as a `<name>.<method>` stage."""
+
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._client, attr)
+        if not callable(value):
+            return value
+        return profiled(f"{self._name}.{attr}")(value)
+
+
+def profile_client(client, name):
+    """Wrap a boto3 client (or a client wrapper) so its network calls appear as stages."""
+    return ProfiledClient(client, name)
@@ -1,3 +1,7 @@
+import json
+
+from .profiling import profiled
+
 system_prompts = {
     "story" : """
             
@@ -198,3 +202,79 @@ def get_character_descriptions(scene_data):
     for character in scene_data["characters"]:
         character_descriptions.append(f"{character['name']} - {character['description']}\n")
     return ",".join(character_descriptions)
+
+
+# Stages of the prompt chain that can be fused into one request, in chain order
+FUSED_STAGES = ["image", "style", "video"]
+
+@profiled()
+def get_fused_prompt(stages=FUSED_STAGES, style=None):
+    """
+    Build one system prompt that runs several stages of the prompt chain for a batch of scenes.
+
+    Each stage reuses its own system prompt; the "style" stage needs a key of
+    `style_presets`. The response lists one entry per scene, keyed by scene_id.
+    """
+    instructions = {
+        "image": system_prompts["image"],
+        "style": get_style_prompt(style) if style else "",
+        "video": system_prompts["video"],
+    }
+    sections = []
+    for i, stage in enumerate(stages):
+        source = "the scene" if i == 0 else f'the "{stages[i - 1]}" prompt of the same scene'
+        sections.append(
+            f'<stage name="{stage}">\n'
+            f'Input: {source}.\n'
+            f"{instructions[stage]}\n"
+            f"</stage>"
+        )
+    example = ", ".join(f'"{stage}": "..."' for stage in stages)
+    return (
+        "You are preparing prompts for several storyboard scenes at once. The user provides a JSON list of scenes.\n"
+        "For EACH scene, complete the following stages in order, using the output of each stage as the input of the next.\n\n"
+        + "\n\n".join(sections)
+        + "\n\nIgnore the response format of the individual stages. Respond ONLY with JSON in the following format, "
+        "with one entry per scene:\n"
+        + '{"scenes": [{"scene_id": 0, ' + example + "}]}"
+    )
+
+@profiled()
+def get_fused_scene_input(scenes):
+    """Serialize scenes for a fused request: id, description, imagery and character descriptions."""
+    return json.dumps([
+        {
+            "scene_id": scene["scene_id"],
+            "description": scene["description"],
+            "imagery": scene["imagery"],
+            "characters": get_character_descriptions(scene),
+        }
+        for scene in scenes
+    ], indent=2)
+
+@profiled()
+def get_multi_style_prompt(styles):
+    """
+    Build one system prompt that revises an image prompt for several `style_presets` at once.
+
+    The revision rules are those of the "style" system prompt; the response maps
+    each style name to its revised prompt.
+    """
+    frames = "\n".join(
+        f'- "{style}": begin with "{style_presets[style]["start"]}" and end with "{style_presets[style]["end"]}"'
+        for style in styles
+    )
+    example = ", ".join(f'"{style}": "..."' for style in styles)
+    return (
+        "Revise the provided Nova Canvas image generation prompt for creating an image for a storyboard, "
+        "once for each of the styles listed below.\n\n"
+        "1. Remove all specific color words from the prompt. You can use shading words where needed. Example: light, medium, dark\n"
+        "2. Remove extra details about the background keeping it simple, but keep the foreground details, especially character descriptions\n"
+        "3. Remove extra details about the style of the image\n"
+        "4. Each revised prompt should begin with the start phrase of its style, then the revised image prompt, "
+        "then the end phrase of its style.\n\n"
+        "Styles:\n"
+        + frames
+        + "\n\nRespond ONLY with JSON in the following format:\n"
+        + '{"prompts": {' + example + "}}"
+    )
@@ -0,0 +1,248 @@
+"""
+Spread Amazon Bedrock runtime traffic across several AWS regions.
+
+A `RegionPool` exposes the same `invoke_model`, `start_async_invoke` and
+`get_async_invoke` methods as a `bedrock-runtime` client, so it can be passed
+as the `bedrock_client` argument of any helper in `bedrock_helpers.py`.
+Request parameters are forwarded unchanged, so anything keyed on the request
+(prompts, seeds, output prefixes) is the same whichever region serves it.
+
+`invoke_model` fails over on throttling, server errors, connection errors and
+timeouts. `start_async_invoke` creates a paid job that may already exist when
+a region errors or times out, so it only fails over when the request was
+rejected (throttling) or never reached the region (connection errors).
+"""
+
+import random
+import threading
+import time
+
+import boto3
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+
+
+THROTTLING_ERROR_CODES = [
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+]
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES + [
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+]
+
+# Raised before the request reaches the region (DNS, connect timeout, ...)
+NOT_SENT_ERRORS = (BotoConnectionError,)
+# Raised by any network failure, including read timeouts after the request was sent
+NETWORK_ERRORS = (BotoConnectionError, HTTPClientError)
+
+# Weight given to the latest outcome in the moving failure rate of a region
+HEALTH_SMOOTHING = 0.2
+# Seconds a region is skipped after it throttles or errors
+COOLDOWN_SECONDS = 10
+MIN_REGION_WEIGHT = 0.05
+
+
+class RegionStats:
+    """Running health figures for one region."""
+
+    def __init__(self, region):
+        self.region = region
+        self.requests = 0
+        self.throttles = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.failure_rate = 0.0
+        self.cooldown_until = 0.0
+
+    def weight(self):
+        return max(MIN_REGION_WEIGHT, 1.0 - self.failure_rate) / (1 + self.in_flight)
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "throttles": self.throttles,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "failure_rate": round(self.failure_rate, 3),
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class RegionPool:
+    """
+    A drop-in replacement for a `bedrock-runtime` client backed by one client per region.
+
+    Parameters:
+    -----------
+    regions : list
+        Region names to spread traffic across, e.g. ["us-east-1", "us-west-2"]
+    clients : dict, optional
+        Pre-built clients keyed by region. Regions without a client get one
+        from `boto3.client("bedrock-runtime", ...)`
+    config : botocore.config.Config, optional
+        Client configuration, e.g. the longer read timeout used in the notebooks
+    model_regions : dict, optional
+        Restricts a model id to a subset of the regions, for models that are
+        not available everywhere
+    seed : int, optional
+        Seed for the region picker, for reproducible tests
+
+    Clients can be stubbed per region to check the failover:
+
+    >>> from botocore.exceptions import ReadTimeoutError
+    >>> class DownRegion:
+    ...     def invoke_model(self, **kwargs):
+    ...         raise ReadTimeoutError(endpoint_url="https://bedrock-runtime.us-east-1.amazonaws.com")
+    >>> class UpRegion:
+    ...     def invoke_model(self, **kwargs):
+    ...         return {"region": "us-west-2"}
+    >>> pool = RegionPool(["us-east-1", "us-west-2"], clients={"us-east-1": DownRegion(), "us-west-2": UpRegion()}, seed=1)
+    >>> pool.invoke_model(modelId="amazon.nova-lite-v1:0")["region"]
+    Region us-east-1: ReadTimeoutError. Failing over...
+    'us-west-2'
+    >>> pool.health()["us-east-1"]["errors"]
+    1
+
+    Errors caused by the request itself are raised without counting against
+    the region:
+
+    >>> from botocore.exceptions import ClientError
+    >>> class RejectingRegion:
+    ...     def invoke_model(self, **kwargs):
+    ...         raise ClientError({"Error": {"Code": "ValidationException"}}, "InvokeModel")
+    >>> pool = RegionPool(["us-east-1"], clients={"us-east-1": RejectingRegion()})
+    >>> pool.invoke_model(modelId="amazon.nova-canvas-v1:0")
+    Traceback (most recent call last):
+    ...
+    botocore.exceptions.ClientError: An error occurred (ValidationException) when calling the InvokeModel operation: Unknown
+    >>> pool.health()["us-east-1"]["errors"], pool.health()["us-east-1"]["cooling_down"]
+    (0, False)
+    """
+
+    def __init__(self, regions, clients=None, config=None, model_regions=None, seed=None):
+        if not regions:
+            raise ValueError("RegionPool needs at least one region.")
+        clients = clients or {}
+        self.regions = list(regions)
+        self.clients = {}
+        for region in self.regions:
+            if region in clients:
+                self.clients[region] = clients[region]
+            else:
+                self.clients[region] = boto3.client("bedrock-runtime", region_name=region, config=config)
+        self.model_regions = model_regions or {}
+        for model_id, allowed in self.model_regions.items():
+            if not allowed:
+                raise ValueError(f"model_regions[{model_id!r}] is empty.")
+            unknown = [region for region in allowed if region not in self.clients]
+            if unknown:
+                raise ValueError(f"model_regions[{model_id!r}] lists regions outside the pool: {unknown}")
+        self.stats = {region: RegionStats(region) for region in self.regions}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def candidate_regions(self, model_id=None):
+        """
+        Return the regions eligible for a model, healthiest first.
+
+        Regions are ordered by a weighted random draw on their health, so load
+        spreads across every healthy region. Regions cooling down after a
+        throttle or error go last and are only used when nothing else is left.
+        """
+        allowed = self.model_regions.get(model_id, self.regions)
+        now = time.monotonic()
+        with self._lock:
+            ready = [r for r in allowed if self.stats[r].cooldown_until <= now]
+            cooling = sorted(
+                (r for r in allowed if self.stats[r].cooldown_until > now),
+                key=lambda r: self.stats[r].cooldown_until,
+            )
+            ordered = []
+            while ready:
+                weights = [self.stats[r].weight() for r in ready]
+                region = self._random.choices(ready, weights=weights)[0]
+                ordered.append(region)
+                ready.remove(region)
+        return ordered + cooling
+
+    def _release(self, region):
+        # Caller-side errors (validation, access, ...) say nothing about the region's health
+        with self._lock:
+            self.stats[region].in_flight -= 1
+
+    def _record(self, region, error_code=None):
+        with self._lock:
+            stats = self.stats[region]
+            stats.in_flight -= 1
+            failed = error_code is not None
+            stats.failure_rate += HEALTH_SMOOTHING * ((1.0 if failed else 0.0) - stats.failure_rate)
+            if error_code in THROTTLING_ERROR_CODES:
+                stats.throttles += 1
+            elif failed:
+                stats.errors += 1
+            if failed:
+                stats.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+
+    def _call(self, regions, method, failover_codes=RETRYABLE_ERROR_CODES, failover_errors=NETWORK_ERRORS, **kwargs):
+        last_error = None
+        for region in regions:
+            with self._lock:
+                self.stats[region].requests += 1
+                self.stats[region].in_flight += 1
+            try:
+                response = getattr(self.clients[region], method)(**kwargs)
+            except ClientError as e:
+                error_code = e.response["Error"]["Code"]
+                if error_code not in RETRYABLE_ERROR_CODES:
+                    self._release(region)
+                    raise
+                self._record(region, error_code)
+                if error_code not in failover_codes:
+                    raise
+                print(f"Region {region}: {error_code}. Failing over...")
+                last_error = e
+                continue
+            except NETWORK_ERRORS as e:
+                self._record(region, type(e).__name__)
+                if not isinstance(e, failover_errors):
+                    raise
+                print(f"Region {region}: {type(e).__name__}. Failing over...")
+                last_error = e
+                continue
+            except Exception:
+                self._release(region)
+                raise
+            self._record(region)
+            return response
+        # Every region failed, let the caller's retry loop back off
+        raise last_error
+
+    def invoke_model(self, **kwargs):
+        return self._call(self.candidate_regions(kwargs.get("modelId")), "invoke_model", **kwargs)
+
+    def start_async_invoke(self, **kwargs):
+        # Not idempotent: only fail over when no job can have been created
+        return self._call(
+            self.candidate_regions(kwargs.get("modelId")), "start_async_invoke",
+            failover_codes=THROTTLING_ERROR_CODES, failover_errors=NOT_SENT_ERRORS, **kwargs
+        )
+
+    def get_async_invoke(self, **kwargs):
+        # Async jobs only exist in the region that started them
+        return self._call([self.region_for_arn(kwargs["invocationArn"])], "get_async_invoke", **kwargs)
+
+    def region_for_arn(self, arn):
+        """Return the pool region an ARN (arn:aws:bedrock:<region>:...) belongs to."""
+        parts = arn.split(":")
+        if len(parts) > 3 and parts[3] in self.clients:
+            return parts[3]
+        raise ValueError(f"ARN {arn} does not belong to any region in the pool.")
+
+    def health(self):
+        """Return a snapshot of the per-region statistics."""
+        with self._lock:
+            return {region: stats.as_dict() for region, stats in self.stats.items()}
@@ -0,0 +1,147 @@
+"""
+Parsing and validation of structured (JSON) model output.
+
+Model responses are parsed with `json.loads` first and repaired locally with
+`json_repair` when that fails. Stories are then checked scene by scene, so
+only the missing or invalid scenes need to be requested again.
+"""
+
+import json
+
+import json_repair
+
+from .profiling import profiled
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a model response cannot be parsed, even after repair."""
+
+
+@profiled()
+def parse_json_response(text, prefix=""):
+    """
+    Parse a JSON object from model output, repairing it locally if needed.
+
+    Parameters:
+    -----------
+    text : str
+        The raw model output
+    prefix : str, optional
+        Text prefilled in the assistant turn (e.g. "{") that the model output continues
+
+    Returns:
+    --------
+    dict
+        The parsed object
+    """
+    raw = prefix + text
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError:
+        parsed = json_repair.loads(raw)
+    if not isinstance(parsed, dict):
+        raise StructuredOutputError(f"Could not parse a JSON object from model output: {raw[:200]!r}")
+    return parsed
+
+
+def _is_text(value):
+    return isinstance(value, str) and value.strip() != ""
+
+
+def _valid_character(character):
+    return isinstance(character, dict) and _is_text(character.get("name")) and _is_text(character.get("description"))
+
+
+def _valid_scene(scene):
+    return (
+        isinstance(scene, dict)
+        and isinstance(scene.get("scene_id"), int)
+        and _is_text(scene.get("description"))
+        and _is_text(scene.get("imagery"))
+        and isinstance(scene.get("characters"), list)
+        and all(_valid_character(c) for c in scene["characters"])
+    )
+
+
+def expected_scene_count(story, number_of_scenes=None):
+    """Return the requested scene count, else the story's "scene_count", else the number of scenes it has."""
+    if isinstance(number_of_scenes, int):
+        return number_of_scenes
+    if isinstance(story.get("scene_count"), int):
+        return story["scene_count"]
+    scenes = story.get("scenes") if isinstance(story.get("scenes"), list) else []
+    scene_ids = [scene.get("scene_id") for scene in scenes if isinstance(scene, dict)]
+    return max([len(scenes)] + [scene_id + 1 for scene_id in scene_ids if isinstance(scene_id, int)])
+
+
+@profiled()
+def validate_story(story, number_of_scenes=None):
+    """
+    Check a story against the format of the "story" system prompt.
+
+    Parameters:
+    -----------
+    story : dict
+        Parsed story with title, characters and scenes
+    number_of_scenes : int, optional
+        Expected scene count, defaults to the story's own "scene_count"
+
+    Returns:
+    --------
+    tuple
+        (story_errors, invalid_scene_ids). Story-level errors (missing title or
+        characters) need a full regeneration; invalid scenes can be repaired
+        one by one.
+    """
+    story_errors = []
+    if not _is_text(story.get("title")):
+        story_errors.append("missing title")
+    characters = story.get("characters")
+    if not isinstance(characters, list) or not characters or not all(_valid_character(c) for c in characters):
+        story_errors.append("missing or invalid characters")
+
+    number_of_scenes = expected_scene_count(story, number_of_scenes)
+    if number_of_scenes == 0:
+        story_errors.append("no scenes")
+    valid_ids = {scene["scene_id"] for scene in story.get("scenes") or [] if _valid_scene(scene)}
+    invalid_scene_ids = [scene_id for scene_id in range(number_of_scenes) if scene_id not in valid_ids]
+    return story_errors, invalid_scene_ids
+
+
+def merge_scenes(story, new_scenes, number_of_scenes):
+    """
+    Replace the invalid scenes of a story with repaired ones, in scene_id order.
+
+    Only valid scenes within range are kept; scenes that are still missing
+    are left for the next repair round.
+    """
+    scenes_by_id = {}
+    # Valid scenes already in the story win over anything the repair call returns
+    for scene in list(story.get("scenes") or []) + list(new_scenes):
+        if _valid_scene(scene) and 0 <= scene["scene_id"] < number_of_scenes:
+            scenes_by_id.setdefault(scene["scene_id"], scene)
+    merged = dict(story)
+    merged["scenes"] = [scenes_by_id[scene_id] for scene_id in sorted(scenes_by_id)]
+    merged["scene_count"] = number_of_scenes
+    return merged
+
+
+@profiled()
+def build_scene_repair_prompt(story, scene_ids):
+    """Build a prompt asking only for the given scenes of an otherwise complete story."""
+    context = {
+        "title": story.get("title"),
+        "characters": story.get("characters"),
+        "scenes": [scene for scene in story.get("scenes") or [] if _valid_scene(scene)],
+    }
+    return f"""
+        The story below is missing valid entries for the scenes with scene_id {scene_ids}.
+
+        <story>
+        {json.dumps(context, indent=2)}
+        </story>
+
+        Generate ONLY the scenes with scene_id {scene_ids} so that they fit between the existing scenes.
+        Use the same character descriptions. Return them in the following JSON format:
+        {{"scenes": [{{"scene_id": 0, "characters": [{{"name": "...", "description": "..."}}], "description": "...", "imagery": "..."}}]}}
+        """
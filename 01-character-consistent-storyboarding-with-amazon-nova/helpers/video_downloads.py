@@ -0,0 +1,163 @@
+"""
+Concurrent downloads of Nova Reel outputs from Amazon S3.
+
+`generate_videos` returns the S3 location of each finished job. Hand those
+locations to a `VideoDownloadManager` as they arrive: downloads start in the
+background while the next job runs, and a local index from invocation to file
+means a video that was already fetched is never downloaded again.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from boto3.s3.transfer import TransferConfig
+
+from .profiling import profiled
+
+
+VIDEO_FILE_NAME = "output.mp4"
+INDEX_FILE_NAME = "video_index.json"
+
+DEFAULT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+)
+
+
+def invocation_id(location):
+    """
+    Return the invocation id for an invocation ARN or a `generate_videos` S3 location.
+
+    Nova Reel writes its output under a prefix named after the last part of
+    the invocation ARN, so both forms map to the same id. The S3 location may
+    include the output prefix (`s3://bucket/folder/<id>`).
+    """
+    if location.startswith("s3://"):
+        return urlparse(location).path.strip("/").split("/")[-1]
+    return location.split("/")[-1]
+
+
+class VideoDownloadManager:
+    """
+    Download Nova Reel videos concurrently and remember where they were saved.
+
+    Parameters:
+    -----------
+    s3_client : boto3 S3 client
+        Client used for `head_object` and `download_file`
+    output_dir : str
+        Directory the videos and the index file are written to
+    max_workers : int, optional
+        Number of videos downloaded at the same time
+    transfer_config : boto3.s3.transfer.TransferConfig, optional
+        Multipart settings used for each download
+    """
+
+    def __init__(self, s3_client, output_dir, max_workers=4, transfer_config=DEFAULT_TRANSFER_CONFIG):
+        self.s3_client = s3_client
+        self.output_dir = output_dir
+        self.transfer_config = transfer_config
+        self.index_path = os.path.join(output_dir, INDEX_FILE_NAME)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = {}
+        os.makedirs(output_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def local_path(self, location):
+        """Return the local file for an invocation if it was downloaded and is intact, else None."""
+        entry = self.index.get(invocation_id(location))
+        if entry and os.path.exists(entry["path"]) and os.path.getsize(entry["path"]) == entry["size"]:
+            return entry["path"]
+        return None
+
+    @profiled("VideoDownloadManager.download")
+    def _download(self, s3_location):
+        key_id = invocation_id(s3_location)
+        cached = self.local_path(s3_location)
+        if cached:
+            return cached
+
+        parsed = urlparse(s3_location)
+        bucket = parsed.netloc
+        key = f"{parsed.path.strip('/')}/{VIDEO_FILE_NAME}"
+        local_path = os.path.join(self.output_dir, f"{key_id}.mp4")
+
+        expected_size = self.s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        self.s3_client.download_file(bucket, key, local_path, Config=self.transfer_config)
+        actual_size = os.path.getsize(local_path)
+        if actual_size != expected_size:
+            os.remove(local_path)
+            raise Exception(f"Downloaded {actual_size} bytes for s3://{bucket}/{key}, expected {expected_size}.")
+
+        with self._lock:
+            self.index[key_id] = {"s3_uri": f"s3://{bucket}/{key}", "path": local_path, "size": actual_size}
+            self._save_index()
+        return local_path
+
+    def submit(self, s3_location):
+        """
+        Start downloading the video of a finished job in the background.
+
+        Parameters:
+        -----------
+        s3_location : str
+            The S3 location returned by `generate_videos`
+
+        Returns:
+        --------
+        concurrent.futures.Future
+            Resolves to the local path of the video
+        """
+        key_id = invocation_id(s3_location)
+        with self._lock:
+            future = self._pending.get(key_id)
+            # Failed downloads are retried on the next submit
+            if future is None or (future.done() and future.exception() is not None):
+                self._pending[key_id] = self._executor.submit(self._download, s3_location)
+            return self._pending[key_id]
+
+    def fetch(self, s3_location):
+        """Return the local path of a video, downloading it first if needed."""
+        return self.local_path(s3_location) or self.submit(s3_location).result()
+
+    def wait(self):
+        """
+        Wait for every submitted download.
+
+        Returns:
+        --------
+        dict
+            Local path per invocation id. Failed downloads are reported and
+            left out, and can be submitted again.
+        """
+        with self._lock:
+            pending = dict(self._pending)
+        results = {}
+        for key_id, future in pending.items():
+            try:
+                results[key_id] = future.result()
+            except Exception as e:
+                print(f"Error downloading video for {key_id}: {str(e)}")
+                with self._lock:
+                    self._pending.pop(key_id, None)
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=True)
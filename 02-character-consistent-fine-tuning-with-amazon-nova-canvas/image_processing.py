@@ -1,15 +1,18 @@
 import json
 import os
 import boto3
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urlparse
 from tqdm import tqdm
 from PIL import Image
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
+
+from profiling import in_context, profiled, stage
 
 s3_client = boto3.client('s3')
 
+@profiled()
 def upload_to_s3(file_path: str, bucket: str, prefix: str) -> str:
     
     file_name = os.path.basename(file_path)
@@ -22,6 +25,7 @@ def upload_to_s3(file_path: str, bucket: str, prefix: str) -> str:
         print(f"Error uploading {file_path}: {str(e)}")
         return None
         
+@profiled()
 def check_image_dimensions(image_path):
     try:
         with Image.open(image_path) as img:
@@ -31,15 +35,23 @@ def check_image_dimensions(image_path):
         print(f"Error checking dimensions for {image_path}: {str(e)}")
         return False
 
+@profiled()
 def process_folders(
     folder_paths: List[str],
     s3_bucket: str,
     s3_prefix: str,
-    max_workers: int = 10
+    max_workers: int = 10,
+    on_record: Optional[Callable[[Dict], None]] = None,
+    collect: bool = True
 ) -> List[Dict]:
     """
     Process multiple folders containing JSONL and image files, upload images to S3,
     and update image references.
+
+    If `on_record` is given, it is called with each updated record as soon as its
+    image is uploaded, e.g. `ManifestWriter.write` to stream the manifest to disk.
+    Records are then in upload completion order. With `collect=False` the records
+    are not kept in memory and an empty list is returned.
     """
 
     all_data = []
@@ -69,6 +81,7 @@ def process_folders(
         """Extract filename from S3 path"""
         return os.path.basename(urlparse(s3_path).path)
 
+    @profiled("upload_image")
     def upload_to_s3(image_path: str, folder_path: str, original_s3_path: str) -> str:
         """Upload single image to S3 and return the new S3 path"""
         image_name = get_filename_from_s3_path(original_s3_path)
@@ -96,44 +109,42 @@ def process_folders(
     for folder_path in folder_paths:
         jsonl_file = next(Path(folder_path).glob("*.jsonl"))
         
-        # Load JSONL data
-        data = []
-        with open(jsonl_file, 'r') as f:
+        # Load JSONL data, grouped by image reference
+        items_by_path = {}
+        with stage("read_jsonl"), open(jsonl_file, 'r') as f:
             for line in f:
-                data.append(json.loads(line.strip()))
+                item = json.loads(line.strip())
+                items_by_path.setdefault(item['image-ref'], []).append(item)
         
         # Create mapping of image references to upload tasks
         upload_tasks = {}
-        for item in data:
-            original_s3_path = item['image-ref']
+        for original_s3_path in items_by_path:
             filename = get_filename_from_s3_path(original_s3_path)
 
             if check_image_dimensions(os.path.join(folder_path, filename)):
                 upload_tasks[original_s3_path] = (filename, folder_path, original_s3_path)
         
-        # Upload images concurrently
-        s3_paths = {}
+        # Upload images concurrently, emitting each record as soon as its image is uploaded
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_path = {
-                executor.submit(upload_to_s3, filename, folder_path, original_s3_path): original_s3_path
+                executor.submit(in_context(upload_to_s3), filename, folder_path, original_s3_path): original_s3_path
                 for original_s3_path, (filename, folder_path, original_s3_path) in upload_tasks.items()
             }
             
-            for future in future_to_path:
-                original_s3_path = future_to_path[future]
-                s3_paths[original_s3_path] = future.result()
-        
-        # Update image references with new S3 paths
-        new_data = []
-        for item in data:
-            if item['image-ref'] in s3_paths and s3_paths[item['image-ref']] is not None:
-                new_item = dict()
-                new_item['image-ref'] = s3_paths[item['image-ref']]
-                new_item['caption'] = item['caption']
-                new_item['id'] = folder_path
-                new_data.append(new_item)
+            for future in as_completed(future_to_path):
+                s3_path = future.result()
+                if s3_path is None:
+                    continue
+                for item in items_by_path[future_to_path[future]]:
+                    new_item = dict()
+                    new_item['image-ref'] = s3_path
+                    new_item['caption'] = item['caption']
+                    new_item['id'] = folder_path
+                    if on_record is not None:
+                        on_record(new_item)
+                    if collect:
+                        all_data.append(new_item)
                 
-        all_data.extend(new_data)
         folder_pbar.update(1)
     
     # Close progress bars
@@ -0,0 +1,185 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+CUSTOMIZATION_JOB = "customization_job"
+PROVISIONED_THROUGHPUT = "provisioned_throughput"
+
+# States after which a resource is no longer polled
+TERMINAL_STATES = {
+    CUSTOMIZATION_JOB: {"Completed", "Failed", "Stopped"},
+    PROVISIONED_THROUGHPUT: {"InService", "Failed"},
+}
+READY_STATES = {
+    CUSTOMIZATION_JOB: "Completed",
+    PROVISIONED_THROUGHPUT: "InService",
+}
+
+INITIAL_POLL_INTERVAL = 15
+MAX_POLL_INTERVAL = 300
+POLL_BACKOFF = 1.5
+
+
+class WatchedResource:
+    """A customization job or provisioned throughput tracked by the watcher."""
+
+    def __init__(self, identifier: str, kind: str, on_change: Optional[Callable], on_ready: Optional[Callable]):
+        self.identifier = identifier
+        self.kind = kind
+        self.on_change = on_change
+        self.on_ready = on_ready
+        self.status = None
+        self.details = {}
+        self.poll_interval = INITIAL_POLL_INTERVAL
+        self.next_poll = 0.0
+        self.polled = threading.Event()
+        self.done = threading.Event()
+
+
+class ControlPlaneWatcher:
+    """
+    Track model customization jobs and provisioned throughput in a background thread.
+
+    Each resource is fetched directly with `get_model_customization_job` or
+    `get_provisioned_model_throughput`. The poll interval grows while a status
+    is unchanged and resets when it changes. Callbacks receive
+    `(identifier, old_status, new_status, details)`; `on_ready` fires once a job
+    is Completed or a provisioned throughput is InService.
+    """
+
+    def __init__(self, bedrock_client):
+        self.bedrock_client = bedrock_client
+        self.resources: Dict[str, WatchedResource] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watch_customization_job(self, job_identifier: str, on_change: Optional[Callable] = None,
+                                on_ready: Optional[Callable] = None) -> WatchedResource:
+        """Watch a customization job by name or ARN."""
+        return self._watch(job_identifier, CUSTOMIZATION_JOB, on_change, on_ready)
+
+    def watch_provisioned_throughput(self, provisioned_model_id: str, on_change: Optional[Callable] = None,
+                                     on_ready: Optional[Callable] = None) -> WatchedResource:
+        """Watch a provisioned throughput by name or ARN."""
+        return self._watch(provisioned_model_id, PROVISIONED_THROUGHPUT, on_change, on_ready)
+
+    def _watch(self, identifier, kind, on_change, on_ready):
+        with self._lock:
+            if identifier not in self.resources:
+                self.resources[identifier] = WatchedResource(identifier, kind, on_change, on_ready)
+            resource = self.resources[identifier]
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return resource
+
+    def status(self, identifier: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Return the last known status of a watched resource.
+
+        A resource that was just added has no status until its first poll; pass
+        `timeout` to wait up to that many seconds for it.
+        """
+        resource = self.resources[identifier]
+        if timeout is not None:
+            resource.polled.wait(timeout)
+        return resource.status
+
+    def details(self, identifier: str) -> Dict:
+        """Return the last get-call response of a watched resource."""
+        return self.resources[identifier].details
+
+    def wait(self, identifier: str, timeout: Optional[float] = None, kind: Optional[str] = None) -> str:
+        """
+        Block until a resource reaches a terminal state and return that state.
+
+        Returns immediately when the resource is already there. Resources not
+        watched yet are added, which covers ids set by hand when coming back
+        to the notebook; `kind` (`CUSTOMIZATION_JOB` or `PROVISIONED_THROUGHPUT`)
+        is required for those.
+        """
+        resource = self.resources.get(identifier)
+        if resource is None:
+            if kind not in TERMINAL_STATES:
+                raise ValueError(f"{identifier} is not watched; pass kind={CUSTOMIZATION_JOB!r} or {PROVISIONED_THROUGHPUT!r}")
+            resource = self._watch(identifier, kind, None, None)
+        if not resource.done.wait(timeout):
+            raise TimeoutError(f"{identifier} is still {resource.status} after {timeout} seconds")
+        return resource.status
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _fetch(self, resource):
+        if resource.kind == CUSTOMIZATION_JOB:
+            response = self.bedrock_client.get_model_customization_job(jobIdentifier=resource.identifier)
+        else:
+            response = self.bedrock_client.get_provisioned_model_throughput(provisionedModelId=resource.identifier)
+        response.pop("ResponseMetadata", None)
+        return response
+
+    def _poll(self, resource):
+        try:
+            response = self._fetch(resource)
+            new_status = response["status"]
+        except ClientError as e:
+            print(f"Error polling {resource.identifier}: {e.response['Error']['Code']}")
+            resource.poll_interval = min(resource.poll_interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
+            return
+        except Exception as e:
+            # Connection errors and timeouts are transient: keep the thread alive and retry later
+            print(f"Error polling {resource.identifier}: {str(e)}")
+            resource.poll_interval = min(resource.poll_interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
+            return
+
+        old_status = resource.status
+        resource.details = response
+        resource.status = new_status
+        resource.polled.set()
+        if new_status == old_status:
+            resource.poll_interval = min(resource.poll_interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
+            return
+
+        resource.poll_interval = INITIAL_POLL_INTERVAL
+        self._notify(resource.on_change, resource, old_status, new_status)
+        if new_status == READY_STATES[resource.kind]:
+            self._notify(resource.on_ready, resource, old_status, new_status)
+        if new_status in TERMINAL_STATES[resource.kind]:
+            resource.done.set()
+
+    def _notify(self, callback, resource, old_status, new_status):
+        if callback is None:
+            return
+        try:
+            callback(resource.identifier, old_status, new_status, resource.details)
+        except Exception as e:
+            print(f"Error in callback for {resource.identifier}: {str(e)}")
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.clear()
+                now = time.monotonic()
+                with self._lock:
+                    active = [r for r in self.resources.values() if not r.done.is_set()]
+                    if not active:
+                        self._thread = None
+                        return
+                for resource in active:
+                    if resource.next_poll <= now:
+                        self._poll(resource)
+                        resource.next_poll = time.monotonic() + resource.poll_interval
+                sleep_for = max(0.0, min(r.next_poll for r in active) - time.monotonic())
+                self._wakeup.wait(sleep_for)
+        finally:
+            # Always let the next watch_* call start a new thread, even if this one failed
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
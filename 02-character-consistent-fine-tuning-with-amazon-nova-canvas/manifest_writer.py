@@ -0,0 +1,110 @@
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class ManifestWriter:
+    """
+    Stream JSONL manifest records to disk as they are produced.
+
+    With `max_bytes` or `max_records` set, output is split into numbered
+    shards (`name-00000.jsonl`, `name-00001.jsonl`, ...); otherwise every record
+    goes to `output_file`. Fields in `exclude_fields` are dropped from each record.
+    Used as a context manager, the first file is created on entry, so it exists
+    even when no record is written.
+    """
+
+    def __init__(self, output_file: str, max_bytes: Optional[int] = None, max_records: Optional[int] = None,
+                 exclude_fields: Iterable[str] = ("id",)):
+        self.output_file = output_file
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.exclude_fields = set(exclude_fields)
+        self.paths: List[str] = []
+        self.record_count = 0
+        self._file = None
+        self._shard_bytes = 0
+        self._shard_records = 0
+
+    def _sharded(self) -> bool:
+        return self.max_bytes is not None or self.max_records is not None
+
+    def _open_shard(self):
+        if self._file:
+            self._file.close()
+        if self._sharded():
+            root, ext = os.path.splitext(self.output_file)
+            path = f"{root}-{len(self.paths):05d}{ext or '.jsonl'}"
+        else:
+            path = self.output_file
+        self._file = open(path, 'w')
+        self.paths.append(path)
+        self._shard_bytes = 0
+        self._shard_records = 0
+
+    def write(self, record: Dict):
+        """Write one record, starting a new shard first if this one would go over its limits."""
+        line = json.dumps({k: v for k, v in record.items() if k not in self.exclude_fields}) + '\n'
+        size = len(line.encode('utf-8'))
+        if self._file is None:
+            self._open_shard()
+        elif self._shard_records and (
+            (self.max_bytes is not None and self._shard_bytes + size > self.max_bytes)
+            or (self.max_records is not None and self._shard_records >= self.max_records)
+        ):
+            self._open_shard()
+        self._file.write(line)
+        self._shard_bytes += size
+        self._shard_records += 1
+        self.record_count += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        if self._file is None:
+            self._open_shard()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_image_refs(manifest_paths: Iterable[str]) -> List[str]:
+    """Return the `image-ref` of every record in the given manifests."""
+    image_refs = []
+    for manifest_path in manifest_paths:
+        with open(manifest_path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    image_refs.append(json.loads(line)['image-ref'])
+    return image_refs
+
+
+def validate_image_refs(image_refs: Iterable[str], s3_client) -> List[str]:
+    """
+    Check that every S3 image reference exists, and return the ones that don't.
+
+    References are grouped by bucket and folder, and each folder is listed once
+    with `list_objects_v2`, so a dataset of thousands of images costs a few
+    list calls instead of one request per object.
+    """
+    keys_by_folder: Dict[Tuple[str, str], set] = defaultdict(set)
+    for image_ref in image_refs:
+        parsed = urlparse(image_ref)
+        key = parsed.path.lstrip('/')
+        folder = key.rsplit('/', 1)[0] + '/' if '/' in key else ''
+        keys_by_folder[(parsed.netloc, folder)].add(key)
+
+    paginator = s3_client.get_paginator('list_objects_v2')
+    missing = []
+    for (bucket, folder), keys in keys_by_folder.items():
+        existing = set()
+        for page in paginator.paginate(Bucket=bucket, Prefix=folder, Delimiter='/'):
+            existing.update(obj['Key'] for obj in page.get('Contents', []) if obj['Size'] > 0)
+        missing.extend(f"s3://{bucket}/{key}" for key in sorted(keys - existing))
+    return missing
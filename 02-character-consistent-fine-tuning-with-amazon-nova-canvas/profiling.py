@@ -0,0 +1,44 @@
+"""
+Opt-in, stage-level profiling of the fine-tuning data preparation.
+
+This is the profiler of the storyboarding sample
+(`01-character-consistent-storyboarding-with-amazon-nova/helpers/profiling.py`),
+loaded from there so both samples share one implementation; see that module
+for what each stage records. Functions in `image_processing.py` are marked as
+pipeline stages with `@profiled`.
+
+    with profile_run("profile"):
+        data = process_folders(folder_paths, bucket, prefix)
+"""
+
+import os
+import sys
+
+_STORYBOARDING_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "01-character-consistent-storyboarding-with-amazon-nova"
+)
+if _STORYBOARDING_DIR not in sys.path:
+    sys.path.append(_STORYBOARDING_DIR)
+
+# propagate runs a function with the caller's context variables, which include the open stages
+from helpers.deadlines import propagate as in_context  # noqa: E402
+from helpers.profiling import (  # noqa: E402
+    Profiler,
+    ProfiledClient,
+    profile_client,
+    profile_run,
+    profiled,
+    record_sleep,
+    stage,
+)
+
+__all__ = [
+    "Profiler",
+    "ProfiledClient",
+    "in_context",
+    "profile_client",
+    "profile_run",
+    "profiled",
+    "record_sleep",
+    "stage",
+]